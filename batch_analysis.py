@@ -0,0 +1,146 @@
+########################################################################################################################
+# Batch analysis
+# Analyses a whole file of positions in one run, over a pool of worker processes, and writes one JSON line per
+# position as soon as it is analysed (so nothing already written is lost if the run is stopped or crashes).
+#
+# Usage: python batch_analysis.py POSITIONS [--output FILE] [--workers N] [--depth D] [--time SECONDS] [--resume]
+# POSITIONS holds records in the input.txt format (mode, color, time left and the 8 board lines), one after the other,
+# blank lines between them being ignored. Every position is searched with the time budget the engine would give
+# itself from the record's clock, unless --time or --depth is given. An output line looks like:
+# {"index": 0, "move": [11, 15], "score": 2, "depth": 9, "nodes": 51234, "time": 1.52, "principal_variation": [...]}
+# with a null move if the side to move has no move left, and the search statistics (SearchStats.as_dict()) under
+# "stats". index is the position of the record in the file (from 0).
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+from homework import BitBoard, Engine, MAX_SEARCH_DEPTH, move_time_budget
+
+batch_worker_engine = None
+
+###########################################################
+# Function to return the (index, input.txt lines) records of a positions file, read as they are needed
+def read_records(path):
+    with open(path) as input_file:
+        lines = []
+        index = 0
+        for line in input_file:
+            if line.strip() == "":
+                continue
+            lines.append(line.strip())
+            if len(lines) == 11:
+                yield index, lines
+                lines = []
+                index += 1
+
+    if len(lines) != 0:
+        raise ValueError("%s ends with an incomplete position" % path)
+
+###########################################################
+# Function run once in every worker process when it starts (and once in the main process when there are no workers)
+def init_batch_worker(tablebase_path):
+    global batch_worker_engine
+    tablebase = None
+    if tablebase_path is not None:
+        import tablebase as tablebase_module
+        tablebase = tablebase_module.EndgameTablebase(tablebase_path)
+    batch_worker_engine = Engine(tablebase=tablebase)
+
+###########################################################
+# Function to analyse one position, task being (index, input.txt lines, time budget, depth)
+# Every position is searched from an empty transposition table, so its result doesn't depend on the positions the
+# worker analysed before
+def analyse_record(task):
+    index, lines, time_budget, depth = task
+    color = 'b' if lines[1] == 'BLACK' else 'w'
+    bitboard = BitBoard.from_grid([list(line) for line in lines[3:11]])
+    if time_budget is None and depth == MAX_SEARCH_DEPTH:
+        time_budget = move_time_budget(bitboard, color, float(lines[2]))
+
+    engine = batch_worker_engine
+    engine.new_game()
+    start_time = time.time()
+    result = engine.analyse(bitboard, color, time_budget, depth)
+
+    return {"index": index, "move": result.move, "score": result.score, "depth": result.depth, "nodes": result.nodes,
+            "time": round(time.time() - start_time, 3), "principal_variation": result.principal_variation,
+            "stats": result.stats.as_dict()}
+
+###########################################################
+# Function to return the indexes of the positions already written to an output file by an earlier run
+def analysed_indexes(path):
+    indexes = set()
+    try:
+        with open(path) as input_file:
+            for line in input_file:
+                indexes.add(json.loads(line)["index"])
+    except FileNotFoundError:
+        pass
+    return indexes
+
+###########################################################
+# Function to cut off the last line of an output file if it was only partly written, so that lines can be appended
+def remove_partial_line(path):
+    try:
+        with open(path, "r+b") as output_file:
+            content = output_file.read()
+            if len(content) != 0 and not content.endswith(b"\n"):
+                output_file.truncate(content.rfind(b"\n") + 1)
+    except FileNotFoundError:
+        pass
+
+###########################################################
+# Function to analyse every position of positions_path and write the results to output_stream as they come
+# The results are written in the order the workers finish them, so they are not always in the order of the file
+def run_batch(positions_path, output_stream, workers=1, time_budget=None, depth=MAX_SEARCH_DEPTH, tablebase_path=None,
+              skip_indexes=()):
+    tasks = ((index, lines, time_budget, depth) for index, lines in read_records(positions_path)
+             if index not in skip_indexes)
+
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, init_batch_worker, (tablebase_path,))
+        results = pool.imap_unordered(analyse_record, tasks)
+    else:
+        pool = None
+        init_batch_worker(tablebase_path)
+        results = (analyse_record(task) for task in tasks)
+
+    try:
+        for result in results:
+            output_stream.write(json.dumps(result) + "\n")
+            output_stream.flush()
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+###########################################################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse a file of input.txt positions, writing JSON lines")
+    parser.add_argument("positions", help="file of input.txt records")
+    parser.add_argument("--output", metavar="FILE", help="file to write the results to (default: standard output)")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument("--time", type=float, help="seconds to search every position, instead of its clock")
+    parser.add_argument("--depth", type=int, default=MAX_SEARCH_DEPTH,
+                        help="largest depth to search, without time limit unless --time is also given")
+    parser.add_argument("--tablebase", metavar="PATH", help="endgame tablebase generated by tablebase.py")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip the positions already in --output and append the others to it")
+    arguments = parser.parse_args()
+
+    if arguments.output:
+        skip_indexes = set()
+        if arguments.resume:
+            remove_partial_line(arguments.output)
+            skip_indexes = analysed_indexes(arguments.output)
+        output_stream = open(arguments.output, "a" if arguments.resume else "w")
+    else:
+        skip_indexes = set()
+        output_stream = sys.stdout
+
+    with output_stream:
+        run_batch(arguments.positions, output_stream, arguments.workers, arguments.time, arguments.depth,
+                  arguments.tablebase, skip_indexes)
+########################################################################################################################
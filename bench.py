@@ -0,0 +1,117 @@
+########################################################################################################################
+# Benchmark
+# Searches a fixed set of positions (opening, middlegame, multi-jump tactics, king endings) to a fixed depth with a
+# fixed seed, so that the number of nodes searched is the same from one run to the next unless the search itself
+# changed. Reports the nodes, time and nodes per second of every position, and compares them with a stored baseline:
+# the run fails (exit status 1) if the node count of a position changed or if the nodes per second dropped by more
+# than the tolerance.
+#
+# Usage: python bench.py [--depth D] [--baseline FILE] [--save-baseline] [--nps-tolerance FRACTION]
+# The last line, "bench: <nodes> nodes <nps> nps", is the signature of the search: a change which is not supposed to
+# change the search (e.g. a speed-up) must leave the nodes unchanged.
+import argparse
+import json
+import os
+import sys
+import time
+
+from homework import BitBoard, Engine
+
+BENCH_DEPTH = 9
+BENCH_SEED = 561
+DEFAULT_NPS_TOLERANCE = 0.2
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# (name, side to move, the 8 board lines separated by spaces)
+BENCH_POSITIONS = [
+    ("opening", 'b', ".b.b.b.b b.b.b.b. .b.b.b.b ........ ........ w.w.w.w. .w.w.w.w w.w.w.w."),
+    ("middlegame", 'b', ".b.b.b.. b...b.b. ...b.b.b ..b..... .w...w.. w.w...w. .w.w.w.. w.....w."),
+    ("middlegame white", 'w', ".....b.b b.b.b... .b...b.w ..b..... ........ w.w...w. .....w.w w.w....."),
+    ("multi-jump", 'b', ".....b.b ..b.b.b. .....b.b ....b... ........ w...b.w. ...w...w ..w.w.w."),
+    ("forced win", 'w', ".......b b.b.b... .b.....w w....... .b.....w ........ ........ B......."),
+    ("kings", 'b', "...W.W.W ........ .....w.. ........ ........ ........ .......B ..B...B."),
+    ("kings and men", 'b', ".B.b.... b....... ...b.b.. ..W..... .w...w.. ......w. .....W.. ........"),
+]
+
+###########################################################
+# Function to search every bench position to depth and return a list of dicts (name, move, score, nodes, time, nps)
+def run_bench(depth=BENCH_DEPTH, report_stream=sys.stdout):
+    results = []
+    for name, side, board in BENCH_POSITIONS:
+        bitboard = BitBoard.from_grid([list(line) for line in board.split()])
+        engine = Engine(seed=BENCH_SEED)
+
+        start_time = time.time()
+        result = engine.analyse(bitboard, side, max_depth=depth)
+        elapsed = time.time() - start_time
+
+        results.append({"name": name, "move": result.move, "score": result.score, "nodes": result.nodes,
+                        "time": elapsed, "nps": result.nodes / elapsed if elapsed > 0 else 0.0})
+        report_stream.write("%-18s %-12s %9d nodes %7.3fs %8.0f nps\n" % (
+            name, "-".join(str(position) for position in result.move), result.nodes, elapsed, results[-1]["nps"]))
+
+    return results
+
+###########################################################
+# Function to return the total nodes and the nodes per second of a bench run
+def bench_totals(results):
+    nodes = sum(result["nodes"] for result in results)
+    elapsed = sum(result["time"] for result in results)
+    return nodes, nodes / elapsed if elapsed > 0 else 0.0
+
+###########################################################
+# Function to return the baseline of a bench run, as stored in the baseline file
+def bench_baseline(results, depth):
+    nodes, nps = bench_totals(results)
+    return {"depth": depth, "nodes": nodes, "nps": round(nps),
+            "positions": {result["name"]: result["nodes"] for result in results}}
+
+###########################################################
+# Function to return the list of differences between a bench run and the baseline that make the run fail
+def compare_with_baseline(results, depth, baseline, nps_tolerance=DEFAULT_NPS_TOLERANCE):
+    failures = []
+    if baseline["depth"] != depth:
+        return ["the baseline was searched to depth %d, not %d" % (baseline["depth"], depth)]
+
+    for result in results:
+        expected = baseline["positions"].get(result["name"])
+        if expected != result["nodes"]:
+            failures.append("%s: %d nodes instead of %s" % (result["name"], result["nodes"], expected))
+
+    nodes, nps = bench_totals(results)
+    if nps < baseline["nps"] * (1 - nps_tolerance):
+        failures.append("%.0f nps, more than %.0f%% below the baseline's %d" % (
+            nps, 100 * nps_tolerance, baseline["nps"]))
+
+    return failures
+
+###########################################################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search a fixed set of positions and compare with the baseline")
+    parser.add_argument("--depth", type=int, default=BENCH_DEPTH, help="depth to search (default: %d)" % BENCH_DEPTH)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--nps-tolerance", type=float, default=DEFAULT_NPS_TOLERANCE,
+                        help="largest drop of nodes per second accepted, as a fraction (default: %.1f)"
+                             % DEFAULT_NPS_TOLERANCE)
+    arguments = parser.parse_args()
+
+    results = run_bench(arguments.depth)
+    total_nodes, total_nps = bench_totals(results)
+    print("bench: %d nodes %.0f nps" % (total_nodes, total_nps))
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w") as baseline_file:
+            json.dump(bench_baseline(results, arguments.depth), baseline_file, indent=2)
+            baseline_file.write("\n")
+    elif os.path.exists(arguments.baseline):
+        with open(arguments.baseline) as baseline_file:
+            failures = compare_with_baseline(results, arguments.depth, json.load(baseline_file),
+                                             arguments.nps_tolerance)
+        for failure in failures:
+            print("FAILED: " + failure)
+        if failures:
+            sys.exit(1)
+    else:
+        print("no baseline at %s, run with --save-baseline to store one" % arguments.baseline)
+########################################################################################################################
@@ -0,0 +1,188 @@
+########################################################################################################################
+# Game records
+# A compact binary format for the games played by selfplay.py (or converted from the text format of
+# opening_book.py --games), written by appending whole games to a file and read back through mmap. Every ply is a
+# fixed size record, so that the position of any ply of any game is found by its index alone, without reading or
+# parsing the rest of the file.
+#
+# Usage: python game_records.py GAMES [GAMES ...] --output FILE
+# appends the games of text game files (the format of opening_book.py --games) to the records file FILE.
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+from homework import BitBoard, INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, enemys_color, is_legal_move, pack_move, \
+    unpack_move
+
+###########################################################
+# File format
+# A header (magic, version) followed by one record of 20 bytes per ply: the position before the ply as its three
+# bitboards (black pieces, white pieces and kings), the move played in it packed with pack_move() and stored as its
+# from and to squares (the low 10 bits) and the mask of the pieces it captures, the result of the game for black (1
+# won, 0 drawn, -1 lost) and flags telling whether white is to move and whether the ply is the first of its game. The
+# last position of a game (after its last move) is not recorded, it follows from the last record.
+RECORDS_MAGIC = b"CKGR"
+RECORDS_VERSION = 1
+RECORDS_HEADER = struct.Struct("<4sH")
+RECORD = struct.Struct("<IIIHIbB")
+MOVE_SQUARES_BITS = 10
+WHITE_TO_MOVE_FLAG = 1
+FIRST_PLY_FLAG = 2
+
+###########################################################
+# Function to tell whether the file at path is a game records file
+def is_game_records_file(path):
+    with open(path, "rb") as input_file:
+        return input_file.read(len(RECORDS_MAGIC)) == RECORDS_MAGIC
+
+###########################################################
+# Class appending games to a game records file, which is created if it doesn't exist
+# A record left incomplete at the end of the file (by a writer killed during a write) is cut off before anything is
+# appended, so that the records written after it stay aligned
+class GameRecordsWriter:
+    def __init__(self, path):
+        self.path = path
+        self.output = open(path, "ab")
+        size = self.output.tell()
+        if size == 0:
+            self.output.write(RECORDS_HEADER.pack(RECORDS_MAGIC, RECORDS_VERSION))
+            self.output.flush()
+        elif not is_game_records_file(path):
+            self.output.close()
+            raise ValueError("%s is not a game records file" % path)
+        elif (size - RECORDS_HEADER.size) % RECORD.size != 0:
+            self.output.truncate(size - (size - RECORDS_HEADER.size) % RECORD.size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.output.close()
+
+    ###########################################################
+    # Function to append a game given by its moves and its result for black (1 won, 0 drawn, -1 lost)
+    # The game starts from bitboard with color to move, by default the initial position. The game is written with a
+    # single write, so that a reader never sees half of it (unless the program is killed during the write, in which
+    # case the reader leaves out the incomplete record at the end).
+    # Raises ValueError, before writing anything, if a move is not legal
+    def add_game(self, moves, result, bitboard=None, color='b'):
+        if bitboard is None:
+            bitboard = BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0)
+        else:
+            bitboard = bitboard.copy()
+        data = bytearray()
+        flags = FIRST_PLY_FLAG
+
+        for ply, move in enumerate(moves):
+            if not is_legal_move(bitboard, color, move):
+                raise ValueError("the move %r of ply %d is not legal" % (move, ply + 1))
+            if color == 'w':
+                flags |= WHITE_TO_MOVE_FLAG
+            packed = pack_move(move)
+            data += RECORD.pack(bitboard.black, bitboard.white, bitboard.kings,
+                                packed & ((1 << MOVE_SQUARES_BITS) - 1), packed >> MOVE_SQUARES_BITS, result, flags)
+            bitboard.make_move(move)
+            color = enemys_color(color)
+            flags = 0
+
+        self.output.write(data)
+        self.output.flush()
+
+###########################################################
+# Class reading a game records file through mmap
+# The records are indexed from 0 in the order they were written, len() being their number
+class GameRecords:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as input_file:
+            self.data = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = RECORDS_HEADER.unpack_from(self.data, 0)
+        if magic != RECORDS_MAGIC or version != RECORDS_VERSION:
+            raise ValueError("%s is not a game records file" % path)
+        self.count = (len(self.data) - RECORDS_HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.data.close()
+
+    ###########################################################
+    # Function to return the record of index i as (black, white, kings, packed move, result, flags)
+    def record(self, i):
+        black, white, kings, squares, captured, result, flags = RECORD.unpack_from(
+            self.data, RECORDS_HEADER.size + i * RECORD.size)
+        return black, white, kings, squares | captured << MOVE_SQUARES_BITS, result, flags
+
+    ###########################################################
+    # Function to return (position as a BitBoard, color to move, move played, result for black) of the record of
+    # index i
+    # Raises ValueError if the move recorded is not a move of the position (the file is corrupted)
+    def position(self, i):
+        black, white, kings, packed, result, flags = self.record(i)
+        bitboard = BitBoard(black, white, kings)
+        color = 'w' if flags & WHITE_TO_MOVE_FLAG else 'b'
+        move = unpack_move(bitboard, color, packed)
+        if move is None:
+            raise ValueError("%s: the move of record %d is not a move of its position" % (self.path, i))
+        return bitboard, color, move, result
+
+    ###########################################################
+    # Function to return all the records in order, with their ply in their game (from 0), as (ply, black, white,
+    # kings, packed move, result, flags)
+    def records(self):
+        ply = 0
+        for offset in range(RECORDS_HEADER.size, RECORDS_HEADER.size + self.count * RECORD.size, RECORD.size):
+            black, white, kings, squares, captured, result, flags = RECORD.unpack_from(self.data, offset)
+            ply = 0 if flags & FIRST_PLY_FLAG else ply + 1
+            yield ply, black, white, kings, squares | captured << MOVE_SQUARES_BITS, result, flags
+
+    ###########################################################
+    # Function to return all the games as (moves, result) pairs, like opening_book.read_games()
+    # Raises ValueError if a move recorded is not a move of its position (the file is corrupted)
+    def games(self):
+        moves = []
+        game_result = None
+        for index, (ply, black, white, kings, packed, result, flags) in enumerate(self.records()):
+            if ply == 0 and len(moves) != 0:
+                yield moves, game_result
+                moves = []
+            color = 'w' if flags & WHITE_TO_MOVE_FLAG else 'b'
+            move = unpack_move(BitBoard(black, white, kings), color, packed)
+            if move is None:
+                raise ValueError("%s: the move of record %d is not a move of its position" % (self.path, index))
+            moves.append(move)
+            game_result = result
+
+        if len(moves) != 0:
+            yield moves, game_result
+
+###########################################################
+if __name__ == "__main__":
+    from opening_book import read_games
+
+    parser = argparse.ArgumentParser(description="Append the games of text game files to a game records file")
+    parser.add_argument("games", nargs="+", help="files of games in the format of opening_book.py --games")
+    parser.add_argument("--output", required=True, help="game records file to append the games to")
+    arguments = parser.parse_args()
+
+    games = 0
+    with GameRecordsWriter(arguments.output) as writer:
+        for path in arguments.games:
+            for number, (moves, result) in enumerate(read_games(path)):
+                try:
+                    if moves is None:
+                        raise result
+                    writer.add_game(moves, result)
+                    games += 1
+                except ValueError as error:
+                    sys.stderr.write("%s game %d skipped: %s\n" % (path, number + 1, error))
+
+    print("%d games, %s is %d bytes" % (games, arguments.output, os.path.getsize(arguments.output)))
+########################################################################################################################
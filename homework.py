@@ -1,7 +1,13 @@
 ########################################################################################################################
 # Import required libraries
-from copy import deepcopy
+import argparse
+import collections
+import io
+import json
+import multiprocessing
 import random
+import socketserver
+import threading
 import time
 import sys
 
@@ -16,714 +22,1765 @@ def enemys_color(color):
     else:
         return '.'
 
+###########################################################
+# Square tables
+# Conversions between serial positions 1-32 and grid positions (0,0)~(7,7), computed once at startup (the serial
+# table has nothing at index 0).
+SERIAL_TO_GRID_POSITION = [None] + [((serial_position - 1) // 4,
+                                     2 * ((serial_position - 1) % 4) + 1 - ((serial_position - 1) // 4) % 2)
+                                    for serial_position in range(1, 33)]
+GRID_TO_SERIAL_POSITION = [[4 * x + y // 2 + 1 for y in range(8)] for x in range(8)]
+
 ###########################################################
 # Function to return the board's grid position (0,0)~(7,7) given the board's serial position from 1-32
 def serial_position_to_grid_position(serial_position):
-    return (
-    (int(serial_position) - 1) // 4, 2 * ((int(serial_position) - 1) % 4) + 1 - ((int(serial_position) - 1) // 4) % 2)
+    return SERIAL_TO_GRID_POSITION[int(serial_position)]
 
 ###########################################################
 # Function to return the board's serial position 1-32 given the board's grid position (0,0)~(7,7)
 def grid_position_to_serial_position(x, y):
-    return 4 * x + y // 2 + 1
+    return GRID_TO_SERIAL_POSITION[x][y]
 
 ###########################################################
-# Function to check whether the move from (x1,y1) to (x2,y2) (either a single move or a capture) can be performed or not
-def go_from_position_to_position_allowed_or_not(board, x1, y1, x2, y2):
-    # boundary constraints ( (0,0)~(7,7) )
-    if x1 < 0 or y1 < 0 or x2 < 0 or y2 < 0 or x1 > 7 or y1 > 7 or x2 > 7 or y2 > 7:
-        return False
-
-    color = board[x1][y1]
-
-    # check whether the current position is empty
-    if color == '.':
-        return False
-
-    # check whether the destination position is not empty
-    if board[x2][y2] != '.':
-        return False
+# Bitboard representation of the board
+# The 32 playable squares are mapped to the bits 0-31 of an integer, bit i being the serial position i + 1, so that the
+# grid row x holds the bits 4x ~ 4x+3. A position is fully described by three 32-bit masks: all black pieces, all white
+# pieces and all kings (of either color).
+FULL_MASK = 0xFFFFFFFF
+EVEN_ROWS_MASK = 0x0F0F0F0F  # rows 0, 2, 4, 6 (playable squares are in the columns 1, 3, 5, 7)
+ODD_ROWS_MASK = 0xF0F0F0F0  # rows 1, 3, 5, 7 (playable squares are in the columns 0, 2, 4, 6)
+LEFT_EDGE_MASK = 0x10101010  # column 0
+RIGHT_EDGE_MASK = 0x08080808  # column 7
+BLACK_KING_ROW_MASK = 0xF0000000  # row 7, where a black man becomes a king
+WHITE_KING_ROW_MASK = 0x0000000F  # row 0, where a white man becomes a king
+BLACK_ADVANCED_HALF_MASK = 0xFFFF0000  # rows 4-7, the enemy's half of the board for black
+WHITE_ADVANCED_HALF_MASK = 0x0000FFFF  # rows 0-3, the enemy's half of the board for white
+INITIAL_BLACK_MASK = 0x00000FFF  # rows 0-2, where the black men start
+INITIAL_WHITE_MASK = 0xFFF00000  # rows 5-7, where the white men start
 
-    x_coord_diff = abs(x1 - x2)
-    y_coord_diff = abs(y1 - y2)
-
-    # check whether the x coordinates' difference is >2 (only single diagonal move with diff 1 or capture(max one opponent piece in b/w) with diff 2 is allowed)
-    if x_coord_diff != 1 and x_coord_diff != 2:
-        return False
-
-    # check whether proper diagonal move
-    if x_coord_diff != y_coord_diff:
-        return False
+###########################################################
+# Functions to shift every piece of a mask by one square in a diagonal direction
+# Squares which would fall off the board are dropped. Going one row down adds 4 to the bit index, plus or minus one
+# depending on the parity of the row, as the playable squares of even and odd rows are staggered.
+def step_down_left(mask):
+    return ((mask & EVEN_ROWS_MASK) << 4 | (mask & ODD_ROWS_MASK & ~LEFT_EDGE_MASK) << 3) & FULL_MASK
 
-    # if it's a white man, it cannot move backwards, so x2 has to be < x1
-    if color == 'w' and x2 > x1:
-        return False
+def step_down_right(mask):
+    return ((mask & EVEN_ROWS_MASK & ~RIGHT_EDGE_MASK) << 5 | (mask & ODD_ROWS_MASK) << 4) & FULL_MASK
 
-    # if it's a black man, it cannot move backwards, so x2 has to be > x1
-    if color == 'b' and x2 < x1:
-        return False
+def step_up_left(mask):
+    return (mask & EVEN_ROWS_MASK) >> 4 | (mask & ODD_ROWS_MASK & ~LEFT_EDGE_MASK) >> 5
 
-    # if there's a possibility of a capture move, check whether the piece that is being crossed over is an enemy piece or not (the middle piece must be the enemy's in order for it to be captured)
-    if x_coord_diff == 2:
-        if board[int((x1 + x2) / 2)][int((y1 + y2) / 2)].lower() != enemys_color(color):
-            return False
+def step_up_right(mask):
+    return (mask & EVEN_ROWS_MASK & ~RIGHT_EDGE_MASK) >> 3 | (mask & ODD_ROWS_MASK) >> 4
 
-    return True
+# black men move down the board (towards row 7) and white men move up (towards row 0), kings move both ways
+BLACK_MAN_DIRECTIONS = (step_down_left, step_down_right)
+WHITE_MAN_DIRECTIONS = (step_up_left, step_up_right)
+KING_DIRECTIONS = (step_down_left, step_down_right, step_up_left, step_up_right)
+REVERSED_KING_DIRECTIONS = (step_up_right, step_up_left, step_down_right, step_down_left)
 
 ###########################################################
-# Function to check whether a piece can be captured or not from the position (x,y)
-def jump_possible_or_not_from_position(board, x, y):
-    # Check whether a jump is possible in any of the four directions
-    if go_from_position_to_position_allowed_or_not(board, x, y, x + 2, y + 2) == True:
-        return True
-    if go_from_position_to_position_allowed_or_not(board, x, y, x + 2, y - 2) == True:
-        return True
-    if go_from_position_to_position_allowed_or_not(board, x, y, x - 2, y - 2) == True:
-        return True
-    if go_from_position_to_position_allowed_or_not(board, x, y, x - 2, y + 2) == True:
-        return True
-
-    return False
+# Function to return the number of pieces in a mask
+def bit_count(mask):
+    return bin(mask).count("1")
 
 ###########################################################
-# Function to check whether a piece can be captured or not from the position (x,y) by one of our pieces
-def jump_possible_or_not_by_us(board, color):
-    # iterate over all board positions
-    for piece in range(1, 33):
-        p = serial_position_to_grid_position(piece)
-        x = p[0]
-        y = p[1]
-
-        # Check whether this board position is our color
-        if board[x][y].upper() == color.upper():
-            if jump_possible_or_not_from_position(board, x, y) == True:
-                return True
-
-    return False
+# Bitboard square tables, indexed by serial position (nothing at index 0) and built once at startup
+# For each of the 4 directions (in the order of KING_DIRECTIONS: down-left, down-right, up-left, up-right) a square has
+# a neighbor (its bit, 0 if off the board) and, if the square two steps away is on the board, a capture landing square
+# (its serial position and bit) with the bit of the square jumped over to get there (both bits 0 otherwise).
+# MOVE_MASKS gives the neighbors a black man, a white man or a king can move to, and JUMPED_BITS the bit captured by
+# going from one serial position to another (0 if it's not a capture).
+NEIGHBOR_BITS = [(0, 0, 0, 0)]
+JUMP_LANDING_SQUARES = [(0, 0, 0, 0)]
+JUMP_LANDING_BITS = [(0, 0, 0, 0)]
+JUMPED_SQUARE_BITS = [(0, 0, 0, 0)]
+for square_bit in [1 << i for i in range(32)]:
+    neighbors = tuple(step(square_bit) for step in KING_DIRECTIONS)
+    landings = tuple(step(step(square_bit)) for step in KING_DIRECTIONS)
+    NEIGHBOR_BITS.append(neighbors)
+    JUMP_LANDING_SQUARES.append(tuple(landing.bit_length() for landing in landings))
+    JUMP_LANDING_BITS.append(landings)
+    JUMPED_SQUARE_BITS.append(tuple(neighbor if landing else 0 for neighbor, landing in zip(neighbors, landings)))
+
+BLACK_MAN_DIRECTION_INDEXES = (0, 1)
+WHITE_MAN_DIRECTION_INDEXES = (2, 3)
+KING_DIRECTION_INDEXES = (0, 1, 2, 3)
+
+BLACK_MAN_MOVE_MASKS = tuple(neighbors[0] | neighbors[1] for neighbors in NEIGHBOR_BITS)
+WHITE_MAN_MOVE_MASKS = tuple(neighbors[2] | neighbors[3] for neighbors in NEIGHBOR_BITS)
+KING_MOVE_MASKS = tuple(neighbors[0] | neighbors[1] | neighbors[2] | neighbors[3] for neighbors in NEIGHBOR_BITS)
+
+JUMPED_BITS = [[0] * 33 for serial_position in range(33)]
+for serial_position in range(1, 33):
+    for direction in KING_DIRECTION_INDEXES:
+        if JUMP_LANDING_SQUARES[serial_position][direction]:
+            JUMPED_BITS[serial_position][JUMP_LANDING_SQUARES[serial_position][direction]] = \
+                JUMPED_SQUARE_BITS[serial_position][direction]
+
+# abs(x-3) for the row x of each square, used for the default value of kings
+KING_ROW_DISTANCES = [0] + [abs(SERIAL_TO_GRID_POSITION[serial_position][0] - 3) for serial_position in range(1, 33)]
 
 ###########################################################
-# Function to move from (x1,y1) to (x2,y2) on the board and alter it (simple move or a capture (but not multiple capture))
-# Returns whether any capture has been made and also the new board after the move has been performed
-def move_from_to_position(board, x1, y1, x2, y2):
-    has_been_captured = False
-
-    board[x2][y2] = board[x1][y1]
-    board[x1][y1] = '.'
-
-    if abs(x1 - x2) == 2:  # It's a capture move
-        board[int((x1 + x2) / 2)][int((y1 + y2) / 2)] = '.'
-        has_been_captured = True
-
-    if x2 == 0 or x2 == 7:
-        # make our piece a king, even if it already is a king
-        board[x2][y2] = board[x2][y2].upper()
-
-    return has_been_captured, board
+# Function to return all the jump moves possible for a single piece standing on the square position (1-32)
+# directions are the indexes of the directions the piece can move in, them is the mask of enemy pieces which can
+# still be captured and empty is the mask of empty squares (counting the square the piece started from).
+# The chains are walked in a single pass with an explicit stack of (move so far, enemy pieces not captured yet, empty
+# squares, crowned): a captured piece is only marked by taking its bit out of them and adding it to empty, so it can
+# neither be jumped twice nor block the rest of the chain, and nothing has to be undone when backtracking. The
+# landing squares never have to be taken out of empty, as a capture can't land back on the square it starts from. A
+# man which reaches the king row stops there, as becoming a king ends the move. Moves come out in depth-first order,
+# every direction in the order of directions.
+def bitboard_jump_sequences(position, directions, them, empty, king_row_mask):
+    sequences = []
+    stack = [([position], them, empty, False)]
+    reversed_directions = directions[::-1]
+
+    while stack:
+        move, them_left, empty_left, crowned = stack.pop()
+        square = move[-1]
+        jumped_bits = JUMPED_SQUARE_BITS[square]
+        landing_bits = JUMP_LANDING_BITS[square]
+        extended = False
+
+        if not crowned:
+            for direction in reversed_directions:
+                jumped = jumped_bits[direction] & them_left
+                if jumped and landing_bits[direction] & empty_left:
+                    extended = True
+                    stack.append((move + [JUMP_LANDING_SQUARES[square][direction]], them_left ^ jumped,
+                                  empty_left | jumped, landing_bits[direction] & king_row_mask))
+
+        if not extended and len(move) > 1:
+            sequences.append(move)
+
+    return sequences
 
 ###########################################################
-# Function to perform all moves from the move list
-def perform_all_moves(board, move):
-    # get the starting position of the move
-    p = serial_position_to_grid_position(move[0])
-    x1 = p[0]
-    y1 = p[1]
-
-    # iterate over the second to the last items on the move list
-    for i in range(1, len(move)):
-        p = serial_position_to_grid_position(move[i])
-        x2 = p[0]
-        y2 = p[1]
+# Zobrist hashing
+# Every (piece type, square) pair gets a random 64-bit key and a position is hashed by XORing the keys of all its pieces,
+# so a move only has to XOR the keys of the squares it changes. The keys come from a fixed seed, so hashes are the same
+# from one run to the next. Piece types are 0 black man, 1 black king, 2 white man, 3 white king.
+zobrist_random = random.Random(561)
+ZOBRIST_KEYS = [[zobrist_random.getrandbits(64) for i in range(32)] for piece_type in range(4)]
+ZOBRIST_WHITE_TO_MOVE = zobrist_random.getrandbits(64)
 
-        # do the move
-        has_been_captured, board_after_move = move_from_to_position(board, x1, y1, x2, y2)
+###########################################################
+# Function to return the Zobrist hash of the pieces on the board (without the side to move)
+def zobrist_hash(black, white, kings):
+    value = 0
 
-        # next loop
-        x1 = x2
-        y1 = y2
+    for i in range(32):
+        bit = 1 << i
+        if black & bit:
+            value ^= ZOBRIST_KEYS[1 if kings & bit else 0][i]
+        elif white & bit:
+            value ^= ZOBRIST_KEYS[3 if kings & bit else 2][i]
 
-    return board_after_move
+    return value
 
 ###########################################################
-# Function to check whether the move performed by us will be legal or not
-def move_legal_or_not(board, move, color):
-    # if the move only contains one element i.e. the starting position, then no legal move exists
-    if len(move) < 2:
-        return False
+# Evaluation weights
+# The heuristic value of a position is the sum of the values of its pieces, given by the evaluation weights: the value
+# of a black man and of a black king on each of the 32 squares (index i for serial position i+1). A white piece is
+# worth as much to white as a black piece of the same kind on the square turned around (serial position 33-s), so that
+# both sides are valued alike. The default weights are the hand-picked ones: a man is worth 7 in the enemy's half of
+# the board and 5 in its own half, a king is worth 10 + abs(x-3), x being its row counted from its own side. Other
+# weights are read from a JSON file {"men": [32 integers], "kings": [32 integers]}, as written by tuner.py.
+DEFAULT_EVALUATION_WEIGHTS = {"men": [7 if (1 << i) & BLACK_ADVANCED_HALF_MASK else 5 for i in range(32)],
+                              "kings": [10 + KING_ROW_DISTANCES[i + 1] for i in range(32)]}
 
-    # get the starting position of the move
-    p = serial_position_to_grid_position(move[0])
-    x1 = p[0]
-    y1 = p[1]
+###########################################################
+# Function to return the piece values given by evaluation weights (see PIECE_VALUES)
+def piece_values(weights):
+    return [list(weights["men"]),
+            list(weights["kings"]),
+            [-weights["men"][31 - i] for i in range(32)],
+            [-weights["kings"][31 - i] for i in range(32)]]
 
-    # checks whether the starting position value is same as the current position value
-    if board[x1][y1].lower() != color.lower():
-        return False
+###########################################################
+# Function to return the evaluation weights the piece values are built from
+def evaluation_weights():
+    return {"men": list(PIECE_VALUES[0]), "kings": list(PIECE_VALUES[1])}
 
-    # checks whether a capture is possible, if possible the player must capture
-    has_been_captured_move = jump_possible_or_not_by_us(board, color)
+###########################################################
+# Function to read evaluation weights from a JSON file
+def load_evaluation_weights(path):
+    with open(path) as input_file:
+        weights = json.load(input_file)
 
-    # if there's no capture move possible, there should only be 2 elements in the move
-    if has_been_captured_move == False and len(move) != 2:
-        return False
+    for kind in ("men", "kings"):
+        values = weights.get(kind, ())
+        if len(values) != 32 or not all(isinstance(value, int) for value in values):
+            raise ValueError("%s: %s should be a list of 32 integers" % (path, kind))
+    return weights
 
-    # temporary board
-    temp_board = deepcopy(board)
+###########################################################
+# Function to write evaluation weights to a JSON file, one kind of piece per line
+def save_evaluation_weights(weights, path):
+    with open(path, "w") as output_file:
+        output_file.write('{"men": %s,\n "kings": %s}\n' % (json.dumps(weights["men"]), json.dumps(weights["kings"])))
 
-    # iterate over the second to the last items on the move list
-    for i in range(1, len(move)):
-        p = serial_position_to_grid_position(move[i])
-        x2 = p[0]
-        y2 = p[1]
-
-        if go_from_position_to_position_allowed_or_not(temp_board, x1, y1, x2, y2) == False:
-            return False
-
-        # do the move
-        has_been_captured, board_after_move = move_from_to_position(temp_board, x1, y1, x2, y2)
-        if has_been_captured_move != has_been_captured:
-            return False
-
-        # next loop
-        x1 = x2
-        y1 = y2
-
-    # check whether the jump is complete and whether any other jump can be made from the last position
-    if has_been_captured_move == True:
-        if jump_possible_or_not_from_position(temp_board, x1, y1) == True:  # now (x1,y1)=(x2,y2)
-            return True  # since we are allowed multiple subsequent captures
-
-    return True
-
-###########################################################
-# Function to check whether any valid move (single move or capture) can be performed by us or not
-def any_valid_move_possible_or_not(board, color):
-    # iterate over all board positions
-    for piece in range(1, 33):
-        p = serial_position_to_grid_position(piece)
-        x = p[0]
-        y = p[1]
-
-        # for single move
-        # check whether this board position is our color
-        if board[x][y].upper() == color.upper():
-            if go_from_position_to_position_allowed_or_not(board, x, y, x + 1, y - 1) == True:
-                # we can move to bottom left
-                return True
-
-            if go_from_position_to_position_allowed_or_not(board, x, y, x + 1, y + 1) == True:
-                # we can move to bottom right
-                return True
-
-            if go_from_position_to_position_allowed_or_not(board, x, y, x - 1, y - 1) == True:
-                # we can move to top left
-                return True
-
-            if go_from_position_to_position_allowed_or_not(board, x, y, x - 1, y + 1) == True:
-                # we can move to top right
-                return True
-
-    # for jump
-    if jump_possible_or_not_by_us(board, color) == True:
-        return True
-
-    return False
-
-###########################################################
-# Function to return all the possible jump moves from (x,y)
-def all_jump_moves_from_position(board, x, y):
-    moves = []
-    serial_position = grid_position_to_serial_position(x, y)
-
-    for i in [-2, 2]:
-        for j in [-2, 2]:
-            # check in all four directions
-            if go_from_position_to_position_allowed_or_not(board, x, y, x + i, y + j):
-                temp_board = deepcopy(board)
-                move_from_to_position(temp_board, x, y, x + i, y + j)
-                child_jump_moves = all_jump_moves_from_position(temp_board, x + i, y + j)
-
-                if len(child_jump_moves) == 0:
-                    moves.append([serial_position, grid_position_to_serial_position(x + i, y + j)])
-                else:
-                    for cjm in child_jump_moves:
-                        sp = [serial_position]
-                        sp.extend(cjm)
-                        moves.append(sp)
+###########################################################
+# Function to make the engine use evaluation weights, in place of the current ones
+# The values are changed in place, so it must be called before any BitBoard is created: a board keeps its value up
+# to date as moves are made, from the values it was created with
+def set_evaluation_weights(weights):
+    PIECE_VALUES[:] = piece_values(weights)
 
-    return moves
+###########################################################
+# Piece values
+# Heuristic value of every (piece type, square) pair, piece types being the same as for Zobrist hashing, built from
+# the evaluation weights. The values of white pieces are negative, so that the sum over all the pieces is the value of
+# the position for black, and a move only has to add the value changes of the squares it touches.
+PIECE_VALUES = piece_values(DEFAULT_EVALUATION_WEIGHTS)
 
 ###########################################################
-# Function to return all the possible moves from (x,y)
-def all_possible_moves_from_position(board, x, y):
-    moves = []
-    has_been_captured = False
+# Function to return the value for black of the position given by its three bitboards, the sum of its piece values
+def material_score(black, white, kings):
+    value = 0
 
-    # check for jumps
-    jm = all_jump_moves_from_position(board, x, y)
-    for m in jm:
-        moves.append(m)
+    for i in range(32):
+        bit = 1 << i
+        if black & bit:
+            value += PIECE_VALUES[1 if kings & bit else 0][i]
+        elif white & bit:
+            value += PIECE_VALUES[3 if kings & bit else 2][i]
 
-    if len(moves) == 0:  # i.e if no jump moves are available
-        # check for single moves
-        serial_position = grid_position_to_serial_position(x, y)
+    return value
 
-        if go_from_position_to_position_allowed_or_not(board, x, y, x + 1, y - 1):
-            moves.append([serial_position, grid_position_to_serial_position(x + 1, y - 1)])
-        if go_from_position_to_position_allowed_or_not(board, x, y, x + 1, y + 1):
-            moves.append([serial_position, grid_position_to_serial_position(x + 1, y + 1)])
-        if go_from_position_to_position_allowed_or_not(board, x, y, x - 1, y - 1):
-            moves.append([serial_position, grid_position_to_serial_position(x - 1, y - 1)])
-        if go_from_position_to_position_allowed_or_not(board, x, y, x - 1, y + 1):
-            moves.append([serial_position, grid_position_to_serial_position(x - 1, y + 1)])
+###########################################################
+# Class holding a board as three bitboards (black pieces, white pieces and kings)
+# Moves are given in the same serial position format (1-32) as the rest of the program, e.g. [9, 14] or [22, 15, 6]
+# hash is the Zobrist hash of the pieces and score the value of the position for black (see material_score()), both
+# kept up to date by make_move and unmake_move
+class BitBoard:
+    __slots__ = ("black", "white", "kings", "hash", "score")
+
+    def __init__(self, black, white, kings):
+        self.black = black
+        self.white = white
+        self.kings = kings
+        self.hash = zobrist_hash(black, white, kings)
+        self.score = material_score(black, white, kings)
+
+    ###########################################################
+    # Function to return an independent copy of this board
+    def copy(self):
+        bitboard = BitBoard.__new__(BitBoard)
+        bitboard.black = self.black
+        bitboard.white = self.white
+        bitboard.kings = self.kings
+        bitboard.hash = self.hash
+        bitboard.score = self.score
+        return bitboard
+
+    ###########################################################
+    # Function to return the key of this position with color ('b' or 'w') to move, for the transposition table
+    def key(self, color):
+        if color == 'w':
+            return self.hash ^ ZOBRIST_WHITE_TO_MOVE
+        return self.hash
+
+    ###########################################################
+    # Function to build the bitboards from the board read from input.txt (list of lists of 'b', 'B', 'w', 'W', '.')
+    @staticmethod
+    def from_grid(board):
+        black = 0
+        white = 0
+        kings = 0
 
-    else:
-        has_been_captured = True
-
-    return moves, has_been_captured  # so, if there are jump moves available, we will always select a jump move over a single move
-
-
-###########################################################
-# Function to return all the possible moves by our pieces
-def all_possible_moves_by_us(board, color):
-    moves = []
-    capture_possible_by_us = jump_possible_or_not_by_us(board, color)
-
-    # iterate over all board positions
-    for piece in range(1, 33):
-        p = serial_position_to_grid_position(piece)
-        x = p[0]
-        y = p[1]
-
-        # check whether this board position is our color
-        if board[x][y].upper() == color.upper():
-
-            apm, has_been_captured = all_possible_moves_from_position(board, x, y)
-
-            if capture_possible_by_us == has_been_captured:
-                for m in apm:
-                    moves.append(m)
-    return moves
-
-###########################################################
-# Evaluation function (Minimax)
-# Values at the leaf nodes are calculated first and then keep getting calculated at each level up
-def evaluation(board, color, depth, whose_chance_to_play, enemy_color, alpha, beta):
-    if depth > 1:  # comes here (depth-1) times and goes to else for leaf nodes
-        depth -= 1
-        opti = float(
-            "-inf")  # opti will contain the best value for player in MAX chance and worst value for player in MIN chance
-
-        # us
-        if whose_chance_to_play == 'max':
-            moves = all_possible_moves_by_us(board, color)  # we get all of our possible moves
-            random.shuffle(moves)
-
-            for move in moves:
-                next_board = deepcopy(board)
-                perform_all_moves(next_board, move)
-                if beta > opti:
-                    value = evaluation(next_board, color, depth, 'min', enemy_color, alpha, beta)
-                    if value > opti:  # -inf is less than everything and anything so we don't need opti == -inf check
-                        opti = value
-                    if opti > alpha:
-                        alpha = opti
-
-        # enemy
-        elif whose_chance_to_play == 'min':
-            moves = all_possible_moves_by_us(board, enemy_color)  # we get all of our enemy's possible moves
-            random.shuffle(moves)
-
-            for move in moves:
-                next_board = deepcopy(board)
-                perform_all_moves(next_board, move)
-                if alpha == float("-inf") or opti == float(
-                        "-inf") or alpha < opti:  # -inf conditions are to be checked only for the first time
-                    value = evaluation(next_board, color, depth, 'max', enemy_color, alpha, beta)
-                    if opti == float("-inf") or value < opti:  # opti = -inf for the first time
-                        opti = value
-                    if opti < beta:
-                        beta = opti
-
-        return opti
-
-    else:  # comes here for the last level i.e for leaf nodes
-        value = 0
-
-        # iterate over all board positions
         for piece in range(1, 33):
             p = serial_position_to_grid_position(piece)
-            x = p[0]
-            y = p[1]
-
-            # heuristic
-            if board[x][y] == color.lower():  # our man
-                if color.lower() == 'b':
-                    if x > 3:
-                        value += 7
-                    else:
-                        value += 5
+            value = board[p[0]][p[1]]
+            bit = 1 << (piece - 1)
 
-                if color.lower() == 'w':
-                    if x < 4:
-                        value += 7
-                    else:
-                        value += 5
+            if value.lower() == 'b':
+                black |= bit
+            elif value.lower() == 'w':
+                white |= bit
+            if value in ('B', 'W'):
+                kings |= bit
 
-            elif board[x][y] == color.upper():  # our king
-                value += 10 + abs(x-3)
+        return BitBoard(black, white, kings)
 
-            elif board[x][y] == enemy_color.lower():  # enemy's man
-                if enemy_color.lower() == 'b':
-                    if x > 3:
-                        value -= 7
-                    else:
-                        value -= 5
+    ###########################################################
+    # Function to return the board in the input.txt format (list of lists of 'b', 'B', 'w', 'W', '.')
+    def to_grid(self):
+        board = [['.'] * 8 for x in range(8)]
 
-                if enemy_color.lower() == 'w':
-                    if x < 4:
-                        value -= 7
-                    else:
-                        value -= 5
+        for piece in range(1, 33):
+            p = serial_position_to_grid_position(piece)
+            bit = 1 << (piece - 1)
 
-            elif board[x][y] == enemy_color.upper():  # enemy's king
-                value -= 10 - abs(x-3)
+            if self.black & bit:
+                board[p[0]][p[1]] = 'B' if self.kings & bit else 'b'
+            elif self.white & bit:
+                board[p[0]][p[1]] = 'W' if self.kings & bit else 'w'
 
-        return value
+        return board
 
-###########################################################
-# Function to return our best move depending on the time remaining to play our game
-def next_move(board, color, time_remaining):
-    moves = all_possible_moves_by_us(board, color)
+    ###########################################################
+    # Function to return the mask of the pieces of color ('b' or 'w') which can capture, found with whole-board shifts
+    # (a piece can jump in a direction if stepping back the other way from an empty square crosses an enemy piece)
+    def jumpers(self, color):
+        if color.lower() == 'b':
+            us, them, man_directions = self.black, self.white, BLACK_MAN_DIRECTIONS
+        else:
+            us, them, man_directions = self.white, self.black, WHITE_MAN_DIRECTIONS
 
-    # if only one move is possible, return that
-    if len(moves) == 1:
-        return moves[0]
+        empty = ~(self.black | self.white) & FULL_MASK
+        jumpers = 0
 
-    # get the enemy's color
-    enemy_color = enemys_color(color)
+        for step, step_back in zip(KING_DIRECTIONS, REVERSED_KING_DIRECTIONS):
+            can_jump = step_back(step_back(empty) & them) & us
+            if step in man_directions:
+                jumpers |= can_jump
+            else:
+                jumpers |= can_jump & self.kings
 
-    equal_moves = []  # equal_moves consists of all the moves that end up with the same value after the Minimax evaluation
+        return jumpers
 
-    best = float("-inf")
-    alpha = float("-inf")
-    beta = float("inf")
+    ###########################################################
+    # Function to return the mask of the pieces of color ('b' or 'w') which have a simple (non capturing) move, found
+    # with whole-board shifts like jumpers()
+    def movers(self, color):
+        if color.lower() == 'b':
+            us, man_directions = self.black, BLACK_MAN_DIRECTIONS
+        else:
+            us, man_directions = self.white, WHITE_MAN_DIRECTIONS
 
-    if time_remaining < 1:
-        depth = 2
-    else:
-        depth = 5
-
-    for move in moves:  # this is MAX's chance (1st level of minimax), so next should be MIN's chance
-        new_board = deepcopy(board)
-        perform_all_moves(new_board, move)
-
-        # beta is always inf here as there is no parent MIN node, so no need to check if we can prune or not
-        move_val = evaluation(new_board, color, depth, 'min', enemy_color, alpha, beta)
-        if best == float("-inf") or move_val > best:
-            best_move = move
-            best = move_val
-
-            equal_moves = []
-            equal_moves.append(move)
-        elif move_val == best:
-            equal_moves.append(move)
-        if best > alpha:
-            alpha = best
-
-    # This tries to check whether there is any next move that will form a defensive structure from the
-    # equal_moves list and returns it.
-    if len(equal_moves) > 1:
-        for move in equal_moves:
-            l = len(move)
-
-            p = serial_position_to_grid_position(move[l - 1])
-            x = p[0]
-            y = p[1]
-
-            if (x + 1) <= 7:
-                if (y + 1) <= 7 and board[x + 1][y + 1].lower() == color.lower():
-                    return move
-                if (y - 1) >= 0 and board[x + 1][y - 1].lower() == color.lower():
-                    return move
-            if (x - 1) >= 0:
-                if (y + 1) <= 7 and board[x - 1][y + 1].lower() == color.lower():
-                    return move
-                if (y - 1) >= 0 and board[x - 1][y - 1].lower() == color.lower():
-                    return move
-
-    return best_move
+        empty = ~(self.black | self.white) & FULL_MASK
+        movers = 0
 
-###########################################################
-# Function for 'single' mode
-# Returns any possible valid move (jump over single move)
-def play_single():
-    if color_play == 'BLACK':
-        color = 'b'
-    else:
-        color = 'w'
+        for step, step_back in zip(KING_DIRECTIONS, REVERSED_KING_DIRECTIONS):
+            can_move = step_back(empty) & us
+            if step in man_directions:
+                movers |= can_move
+            else:
+                movers |= can_move & self.kings
 
-    while any_valid_move_possible_or_not(board, color) == True:
-        temp_board = deepcopy(board)
-        moves = all_possible_moves_by_us(temp_board, color)
+        return movers
 
-        if len(moves) == 1:
-            move_final = []
-            move = moves[0]
-            if move_legal_or_not(board, move, color) == True:
-                for position in move:
-                    position = serial_position_to_grid_position(position)
-                    move_final.append(position)
+    ###########################################################
+    # Function to return all the jump moves of color ('b' or 'w'), an empty list if it can't capture
+    # Only the pieces found by jumpers() are walked, most positions do not have any
+    def captures(self, color):
+        if color.lower() == 'b':
+            them, king_row_mask, man_directions = self.white, BLACK_KING_ROW_MASK, BLACK_MAN_DIRECTION_INDEXES
+        else:
+            them, king_row_mask, man_directions = self.black, WHITE_KING_ROW_MASK, WHITE_MAN_DIRECTION_INDEXES
+
+        jumpers = self.jumpers(color)
+        moves = []
+        if jumpers:
+            empty = ~(self.black | self.white) & FULL_MASK
+            kings = self.kings
+            while jumpers:
+                square_bit = jumpers & -jumpers
+                jumpers ^= square_bit
+                position = square_bit.bit_length()
+
+                if square_bit & kings:
+                    moves.extend(bitboard_jump_sequences(position, KING_DIRECTION_INDEXES, them, empty | square_bit, 0))
+                else:
+                    moves.extend(bitboard_jump_sequences(position, man_directions, them, empty | square_bit,
+                                                         king_row_mask))
 
-            return move_final
+        return moves
 
-        moves_final = []
-        for move in moves:
-            move_final = []
-            if move_legal_or_not(board, move, color) == True:
-                for position in move:
-                    position = serial_position_to_grid_position(position)
-                    move_final.append(position)
-                moves_final.append(move_final)
-
-        moves_final_jumps = []
-        moves_final_single_moves = []
-
-        for i in range(0, len(moves_final)):
-            x1 = moves_final[i][0][0]
-            y1 = moves_final[i][0][1]
-
-            x2 = moves_final[i][1][0]
-            y2 = moves_final[i][1][1]
-
-            # check whether the move is a jump or not
-            if (abs(x1 - x2) == 2 and abs(y1 - y2) == 2):
-                moves_final_jumps.append(moves_final[i])
-            else:
-                moves_final_single_moves.append(moves_final[i])
+    ###########################################################
+    # Function to return all the legal moves of color ('b' or 'w')
+    # Only jump moves are returned if any capture is possible, as capturing is mandatory
+    def moves(self, color):
+        moves = self.captures(color)
+        if moves:
+            return moves
 
-        # if a jump is possible, we will always return that over a single move
-        if len(moves_final_jumps) != 0:
-            random_number = random.randint(0, len(moves_final_jumps) - 1)
-            # to return a random jump out of all the jumps possible
-            return moves_final_jumps[random_number]
+        if color.lower() == 'b':
+            us, man_move_masks = self.black, BLACK_MAN_MOVE_MASKS
         else:
-            random_number = random.randint(0, len(moves_final) - 1)
-            # else return a random move out of all the moves possible
-            return moves_final[random_number]
+            us, man_move_masks = self.white, WHITE_MAN_MOVE_MASKS
+        empty = ~(self.black | self.white) & FULL_MASK
+        kings = self.kings
+
+        pieces = us
+        while pieces:
+            square_bit = pieces & -pieces
+            pieces ^= square_bit
+            position = square_bit.bit_length()
+
+            targets = (KING_MOVE_MASKS if square_bit & kings else man_move_masks)[position] & empty
+            while targets:
+                target = targets & -targets
+                targets ^= target
+                moves.append([position, target.bit_length()])
+
+        return moves
+
+    ###########################################################
+    # Function to perform the move (simple move or single/multiple jump) on this board in place
+    # Returns the undo record (from_bit, to_bit, captured, captured_kings, promoted, hash, score) that unmake_move needs
+    # to restore the exact previous position: the squares the piece left and reached, the mask of captured pieces and
+    # of the kings among them, the bit of the new king if the move crowned a man (0 otherwise), the previous hash and
+    # the previous score
+    def make_move(self, move):
+        from_bit = 1 << (move[0] - 1)
+        captured = 0
+
+        for i in range(1, len(move)):
+            captured |= JUMPED_BITS[move[i - 1]][move[i]]  # 0 for a single move
+
+        i1 = move[-1] - 1
+        to_bit = 1 << i1
+        moving = from_bit ^ to_bit  # empty if a king jumps around back to its starting square
+        kings = self.kings
+        captured_kings = captured & kings
+
+        old_hash = self.hash
+        old_score = self.score
+
+        if self.black & from_bit:
+            self.black ^= moving
+            self.white ^= captured
+            king_row_mask = BLACK_KING_ROW_MASK
+            man_type = 0
+            captured_man_type = 2
+        else:
+            self.white ^= moving
+            self.black ^= captured
+            king_row_mask = WHITE_KING_ROW_MASK
+            man_type = 2
+            captured_man_type = 0
+
+        if kings & from_bit:
+            kings ^= moving
+            promoted = 0
+            from_type = to_type = man_type + 1
+        else:
+            promoted = to_bit & king_row_mask
+            from_type = man_type
+            to_type = man_type + 1 if promoted else man_type
+        self.kings = (kings ^ captured_kings) | promoted
+        new_hash = old_hash ^ ZOBRIST_KEYS[from_type][move[0] - 1] ^ ZOBRIST_KEYS[to_type][i1]
+        new_score = old_score - PIECE_VALUES[from_type][move[0] - 1] + PIECE_VALUES[to_type][i1]
+
+        remaining = captured
+        while remaining:
+            captured_bit = remaining & -remaining
+            remaining ^= captured_bit
+            captured_type = captured_man_type + 1 if captured_bit & captured_kings else captured_man_type
+            captured_index = captured_bit.bit_length() - 1
+            new_hash ^= ZOBRIST_KEYS[captured_type][captured_index]
+            new_score -= PIECE_VALUES[captured_type][captured_index]
+        self.hash = new_hash
+        self.score = new_score
+
+        return from_bit, to_bit, captured, captured_kings, promoted, old_hash, old_score
+
+    ###########################################################
+    # Function to take back a move performed by make_move, given the undo record it returned
+    # Jump landings are always two rows apart, so a piece can never end its move on a square it captured from
+    def unmake_move(self, undo):
+        from_bit, to_bit, captured, captured_kings, promoted, self.hash, self.score = undo
+        moving = from_bit ^ to_bit
+        kings = self.kings ^ promoted
+
+        if kings & to_bit:
+            kings ^= moving
+        self.kings = kings | captured_kings
+
+        if self.black & to_bit:
+            self.black ^= moving
+            self.white |= captured
+        else:
+            self.white ^= moving
+            self.black |= captured
 
 ###########################################################
-# Function for 'game' mode
-# Returns the best possible valid move
-def play_game():
-    if color_play == 'BLACK':
-        color = 'b'
-    else:
-        color = 'w'
+# Move packing
+# A move is packed into a single integer to be stored in files: bits 0-4 hold its from serial position - 1, bits 5-9
+# its to serial position - 1 and bits 10-41 the mask of the pieces it captures. Two moves of a position with the same
+# from, to and captures lead to the same position, so a packed move is turned back into a move by looking it up among
+# the moves generated in the position.
+def pack_move(move):
+    captured = 0
+    for i in range(1, len(move)):
+        captured |= JUMPED_BITS[move[i - 1]][move[i]]
+    return (move[0] - 1) | ((move[-1] - 1) << 5) | (captured << 10)
 
-    while any_valid_move_possible_or_not(board, color) == True:
-        temp_board = deepcopy(board)
-        next_move_to_be_returned = next_move(temp_board, color, time_remaining)
+###########################################################
+# Function to return the move of color ('b' or 'w') in the position which packs to packed, or None if there's none
+def unpack_move(bitboard, color, packed):
+    for move in bitboard.moves(color):
+        if pack_move(move) == packed:
+            return move
+    return None
 
-        if move_legal_or_not(board, next_move_to_be_returned, color) == True:
-            perform_all_moves(board, next_move_to_be_returned)
+###########################################################
+# Move notation
+# Moves are written to output.txt in the notation of the assignment: a single move is the line "E c3 d4" and a jump
+# one line per piece captured, e.g. "J c3 e5" then "J e5 g7", every line giving the square the piece leaves and the
+# square it reaches. Squares are named by their column a-h and their row 1-8, row 8 being the first line of the board
+# in input.txt. The names of the squares are computed once, and a move is written to its file with a single write.
+SINGLE_MOVE_PREFIX = "E"
+JUMP_PREFIX = "J"
+SQUARE_NAMES = [None] + ["abcdefgh"[y] + str(8 - x) for x, y in SERIAL_TO_GRID_POSITION[1:]]
+SQUARE_NAME_POSITIONS = {name: serial_position for serial_position, name in enumerate(SQUARE_NAMES) if name}
 
-            return next_move_to_be_returned, board
+###########################################################
+# Function to return the output.txt text of a move
+# Every line of a jump ends with " \n" and a single move has no line end, as output.txt has always been written
+def encode_move(move):
+    if not JUMPED_BITS[move[0]][move[1]]:
+        return "%s %s %s" % (SINGLE_MOVE_PREFIX, SQUARE_NAMES[move[0]], SQUARE_NAMES[move[1]])
+    return "".join(["%s %s %s \n" % (JUMP_PREFIX, SQUARE_NAMES[move[i - 1]], SQUARE_NAMES[move[i]])
+                    for i in range(1, len(move))])
 
 ###########################################################
-# read input
-# make all important variables global
-global game_type, color_play, time_remaining, board1, board
+# Function to return the move written as text in the notation of output.txt
+# Raises ValueError if the text is not a single move or the lines of one jump (whether the move is legal in a position
+# is up to is_legal_move())
+def decode_move(text):
+    move = []
+    prefix = None
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) == 0:
+            continue
+        if len(fields) != 3 or fields[0] not in (SINGLE_MOVE_PREFIX, JUMP_PREFIX) or \
+                fields[1] not in SQUARE_NAME_POSITIONS or fields[2] not in SQUARE_NAME_POSITIONS:
+            raise ValueError("%r is not a move line" % line)
+
+        from_position = SQUARE_NAME_POSITIONS[fields[1]]
+        to_position = SQUARE_NAME_POSITIONS[fields[2]]
+        if fields[0] == SINGLE_MOVE_PREFIX:
+            valid = prefix is None and 1 << (to_position - 1) in NEIGHBOR_BITS[from_position]
+        else:
+            valid = prefix in (None, JUMP_PREFIX) and (len(move) == 0 or move[-1] == from_position) and \
+                    JUMPED_BITS[from_position][to_position] != 0
+        if not valid:
+            raise ValueError("%r is not a valid step of the move %r" % (line, move))
 
-input_file = open("input.txt")
-input_file_string = input_file.read().split('\n')
+        if len(move) == 0:
+            move.append(from_position)
+        move.append(to_position)
+        prefix = fields[0]
 
-game_type = input_file_string[0]
-color_play = input_file_string[1]
-time_remaining = float(input_file_string[2])
+    if len(move) == 0:
+        raise ValueError("no move in %r" % text)
+    return move
 
-board1 = []
+###########################################################
+# Function to write the output.txt text of a move to fp, in one write
+def write_move(fp, move):
+    fp.write(encode_move(move))
 
-for i in range(8):
-    a = input_file_string[3 + i]
-    board1.append(a)
+###########################################################
+# Move legality
+# The moves of BitBoard.moves() are legal by construction (captures being mandatory), so the moves the engine finds
+# are played without being checked again, beyond a debug assertion. Moves coming from outside (an input file, another
+# engine) are looked up among the moves generated in the position, kept as a set of tuples so that a move is found by
+# its hash instead of being compared with every move; a referee checking several moves of the same position builds
+# the set once with legal_move_set().
+def legal_move_set(bitboard, color):
+    return {tuple(move) for move in bitboard.moves(color)}
 
-board = [list(split) for split in board1]
+###########################################################
+# Function to tell whether move is a legal move of color in the position, legal_moves being the legal_move_set() of
+# the position if it was already built
+def is_legal_move(bitboard, color, move, legal_moves=None):
+    if legal_moves is None:
+        legal_moves = legal_move_set(bitboard, color)
+    return move is not None and tuple(move) in legal_moves
 
-# Play
-fp = open("output.txt", "w")
+###########################################################
+# Game history
+# A capture or a man moving can never be taken back, so no position played before such a move can come again: only
+# the positions since the last one can repeat, and their number is also the number of plies played without progress.
+# A game is drawn when a position comes again (in the search a single repetition is enough, as whatever could be
+# gained by repeating could have been gained the first time) or after NO_PROGRESS_PLIES plies without progress.
+NO_PROGRESS_PLIES = 100
 
-notations = {"0": "a", "1": "b", "2": "c", "3": "d", "4": "e", "5": "f", "6": "g", "7": "h"}
+###########################################################
+# Function to tell whether a move, given the undo record make_move returned for it and the board after it, was a
+# capture or a man moving (including one becoming a king)
+def irreversible_move(bitboard, undo):
+    return undo[2] or undo[4] or not bitboard.kings & undo[1]
 
-# for 'single' mode
-if game_type == 'SINGLE':
-    result = play_single()
+###########################################################
+# Class holding the keys (see BitBoard.key()) of the positions of a game since the last capture or man move, the last
+# one being the current position
+class GameHistory:
+    def __init__(self, bitboard=None, color='b'):
+        self.keys = [] if bitboard is None else [bitboard.key(color)]
+
+    def copy(self):
+        history = GameHistory()
+        history.keys = list(self.keys)
+        return history
+
+    ###########################################################
+    # Function to play the move of color on bitboard and record the position after it
+    def play(self, bitboard, color, move):
+        undo = bitboard.make_move(move)
+        if irreversible_move(bitboard, undo):
+            self.keys = []
+        self.keys.append(bitboard.key(enemys_color(color)))
+        return undo
+
+    ###########################################################
+    # Function to return the number of times the position of key was reached since the last capture or man move
+    def repetitions(self, key):
+        return self.keys.count(key)
+
+    @property
+    def no_progress_plies(self):
+        return max(0, len(self.keys) - 1)
 
-    # for single/multiple jumps
-    x1 = result[0][0]
-    y1 = result[0][1]
+###########################################################
+# Function to return the history of a game given by its moves from the initial position, ending in the position
+# bitboard with color to move, or None if the moves don't lead to it
+# The last move of the enemy may be missing (the enemy only gives us the board after it), in which case it is found
+# among the moves leading to the position and appended to moves.
+def replay_game_history(moves, bitboard, color):
+    board = BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0)
+    history = GameHistory(board, 'b')
+    move_color = 'b'
+    for move in moves:
+        if not is_legal_move(board, move_color, move):
+            return None
+        history.play(board, move_color, move)
+        move_color = enemys_color(move_color)
+
+    target = (bitboard.black, bitboard.white, bitboard.kings)
+    if move_color == color and (board.black, board.white, board.kings) == target:
+        return history
+
+    if move_color != color:
+        for move in board.moves(move_color):
+            undo = board.make_move(move)
+            reached = (board.black, board.white, board.kings) == target
+            board.unmake_move(undo)
+            if reached:
+                history.play(board, move_color, move)
+                moves.append(move)
+                return history
+    return None
 
-    x2 = result[1][0]
-    y2 = result[1][1]
+###########################################################
+# Transposition table
+# Remembers the result of every searched position, so that positions reached again through a different move order (or
+# in a later search) are not searched twice. Entries are tuples (key, depth, score, bound, move, generation): score
+# is seen from the side to move and is exact or only a lower/upper bound of the real value, move is the best move
+# found. The table is a fixed number of buckets of two slots: the first one keeps the deepest search of the bucket
+# (unless it comes from an older search) and the second one always takes the latest entry.
+EXACT_BOUND = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+TRANSPOSITION_TABLE_SIZE_MB = 64
+TRANSPOSITION_TABLE_ENTRY_BYTES = 256  # rough size of one entry with its Python objects
+
+class TranspositionTable:
+    def __init__(self, size_mb=TRANSPOSITION_TABLE_SIZE_MB):
+        # the number of buckets is the largest power of 2 fitting in size_mb, so a key is turned into a bucket by a mask
+        buckets = 1
+        while buckets * 4 * TRANSPOSITION_TABLE_ENTRY_BYTES <= size_mb * 1024 * 1024:
+            buckets *= 2
+
+        self.mask = buckets - 1
+        self.slots = [None] * (2 * buckets)
+        self.generation = 0
+
+    ###########################################################
+    # Function to remove every entry
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.generation = 0
+
+    ###########################################################
+    # Function to be called at the start of every new search, entries of the previous ones become replaceable
+    def new_search(self):
+        self.generation += 1
+
+    ###########################################################
+    # Function to return the entry stored for the key, or None
+    def probe(self, key):
+        index = 2 * (key & self.mask)
+        entry = self.slots[index]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self.slots[index + 1]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    ###########################################################
+    # Function to store the result of a search, replacing according to the depth-preferred/always-replace scheme
+    def store(self, key, depth, score, bound, move):
+        index = 2 * (key & self.mask)
+        entry = (key, depth, score, bound, move, self.generation)
+        deepest = self.slots[index]
+
+        if deepest is None or deepest[0] == key or deepest[1] <= depth or deepest[5] != self.generation:
+            self.slots[index] = entry
+        else:
+            self.slots[index + 1] = entry
 
-    if (abs(x1 - x2) == 2 and abs(y1 - y2) == 2):
-        output_final_jumps = []
+###########################################################
+# Time management
+# The search is stopped by raising SearchTimeout from inside Engine.evaluation() once the deadline (a time.time()
+# value) has passed. The clock is only looked at every TIME_CHECK_INTERVAL nodes as time.time() is slow compared to a
+# node.
+TIME_CHECK_INTERVAL = 1024
+TIME_SAFETY_MARGIN = 0.1  # seconds kept aside for starting the program and writing output.txt
+MAX_SEARCH_DEPTH = 64
 
-        for i in range(0, len(result) - 1):
-            x1 = result[i][0]
-            y1 = result[i][1]
+class SearchTimeout(Exception):
+    pass
 
-            letter_jumps = notations["{0}".format(y1)]
-            output_jumps = "J" + " " + letter_jumps + "{0}".format(8 - x1)
+###########################################################
+# Function to return the time in seconds we can spend searching our next move, given the time left on our clock
+# The clock left is shared among the moves we still expect to play, which gets fewer as our pieces disappear. As a
+# search only starts a new iteration while it has used less than a sixth of its budget, it usually takes about a third
+# of it, but a single move never gets more than half of the clock left so that a tactical position cannot lose the
+# game on time.
+def move_time_budget(bitboard, color, time_remaining):
+    our_pieces = bit_count(bitboard.black if color.lower() == 'b' else bitboard.white)
+    moves_to_go = 8 + 2 * our_pieces
+    usable_time = max(0.0, time_remaining - TIME_SAFETY_MARGIN)
+
+    return min(3 * usable_time / moves_to_go, usable_time / 2)
 
-            output_final_jumps.append(output_jumps)
+###########################################################
+# Move ordering
+# Alpha-beta prunes the most when the best move is searched first, so the moves of every node are sorted: the hash
+# move (best move found by an earlier search of the position) first, then the captures taking the most pieces, then
+# the killer moves (the last two quiet moves which caused a cutoff at the same ply) and the rest by their history
+# score (how often and how deep the move caused a cutoff anywhere in the tree). Moves of equal rank keep the order of
+# the move generator, unless the engine was given a seed, then ties are broken randomly.
+HASH_MOVE_SCORE = 1 << 40
+CAPTURE_SCORE = 1 << 36  # plus 1 << 32 for every captured piece
+KILLER_MOVE_SCORES = (1 << 31, 1 << 30)
+HISTORY_TABLE_SIZE = 2 * 33 * 33
 
-        letter_last_position_jumps = notations["{0}".format(result[len(result) - 1][1])]
-        output_last_position_jumps = "J" + " " + letter_last_position_jumps + "{0}".format(
-            8 - result[len(result) - 1][0])
-        output_final_jumps.append(output_last_position_jumps)
+###########################################################
+# Function to return the index of a move in the history table
+# The table is indexed by side to move (0 black, 1 white), from and to serial positions
+def history_index(color, move):
+    return ((0 if color == 'b' else 1) * 33 + move[0]) * 33 + move[-1]
 
-        output_final_jumps_final = []
-        output_final_jumps_final.append(output_final_jumps[0])
+###########################################################
+# Scores
+# A side which cannot move has lost. Such positions are scored WIN_SCORE (from the winner's point of view) minus the
+# number of moves played since the root, so that quicker wins and slower losses are preferred. A win found in the
+# endgame tablebase also counts the plies from the tablebase position to the end of the game, up to
+# TABLEBASE_MAX_PLIES (see tablebase.py), so won scores are the ones above WIN_SCORE - WON_SCORE_MARGIN. Every
+# heuristic score is far below that.
+WIN_SCORE = 1000000
+INFINITE_SCORE = 2 * WIN_SCORE
+TABLEBASE_MAX_PLIES = 254
+WON_SCORE_MARGIN = MAX_SEARCH_DEPTH + TABLEBASE_MAX_PLIES
 
-        # if our piece becomes a king during one of the moves, we have to stop
-        i = 1
-        while i < (len(output_final_jumps)):
-            if color_play == 'BLACK':
-                char_to_be_checked = '1'
-                if output_final_jumps[i][3] == char_to_be_checked:
-                    output_final_jumps_final.append(output_final_jumps[i])
-                    break
-                else:
-                    output_final_jumps_final.append(output_final_jumps[i])
+###########################################################
+# Functions to convert won/lost scores between distance from the root (search) and distance from the position
+# (transposition table), as the same position can be reached at different plies
+def score_to_table(score, ply):
+    if score > WIN_SCORE - WON_SCORE_MARGIN:
+        return score + ply
+    if score < WON_SCORE_MARGIN - WIN_SCORE:
+        return score - ply
+    return score
+
+def score_from_table(score, ply):
+    if score > WIN_SCORE - WON_SCORE_MARGIN:
+        return score - ply
+    if score < WON_SCORE_MARGIN - WIN_SCORE:
+        return score + ply
+    return score
 
+###########################################################
+# Function to return the heuristic value of the board for color ('b' or 'w')
+def static_evaluation(bitboard, color):
+    # heuristic, the values of our pieces minus those of the enemy's (see the evaluation weights). The board keeps the
+    # value for black up to date as moves are made, so there's nothing left to count here
+    if color == 'b':
+        return bitboard.score
+    return -bitboard.score
 
-            elif color_play == 'WHITE':
-                char_to_be_checked = '8'
-                if output_final_jumps[i][3] == char_to_be_checked:
-                    output_final_jumps_final.append(output_final_jumps[i])
-                    break
-                else:
-                    output_final_jumps_final.append(output_final_jumps[i])
+###########################################################
+# Function to check whether the move of the side whose pieces are us forms a defensive structure (ends next to one of
+# its other pieces), which is preferred between root moves of the same value
+def defensive_move(us, move):
+    return KING_MOVE_MASKS[move[-1]] & (us ^ (1 << (move[0] - 1))) != 0
 
-            i += 1
+###########################################################
+# Quiescence search
+# A leaf where the side to move has a capture is in the middle of an exchange and its static value would be badly
+# wrong, as capturing is mandatory. Such leaves are searched further, over the (forced) captures only, until a quiet
+# position is reached. As nothing else can be played, there is no "stand pat" option as in chess. Long capture chains
+# are cut off by a budget of nodes per leaf, after which the static value is used as it is.
+QUIESCENCE_NODE_BUDGET = 200
 
-        for i in range(0, len(output_final_jumps_final) - 1):
-            output_to_be_written_to_file_jumps = output_final_jumps_final[i] + " " + output_final_jumps_final[
-                i + 1].replace("J", "").replace(" ", "")
-            print(output_to_be_written_to_file_jumps, '\n', end="", file=fp)
+###########################################################
+# Class holding the statistics of a search
+# counters is the tuple returned by Engine.search_counters(): nodes (interior and quiescence nodes, leaves included),
+# interior nodes, leaf nodes, transposition table hits and cutoffs (interior nodes whose value came from the table),
+# beta cutoffs, beta cutoffs by the first move searched and tablebase hits. iteration_times and iteration_nodes give
+# the time and the number of nodes the search had used when each iteration of the iterative deepening was completed.
+class SearchStats:
+    def __init__(self, counters=(0, 0, 0, 0, 0, 0, 0, 0), depth=0, iteration_times=(), iteration_nodes=(), time=0.0):
+        self.nodes, self.interior_nodes, self.leaf_nodes, self.tt_hits, self.tt_cutoffs, self.cutoffs, \
+            self.first_move_cutoffs, self.tablebase_hits = counters
+        self.depth = depth
+        self.iteration_times = list(iteration_times)
+        self.iteration_nodes = list(iteration_nodes)
+        self.time = time
+
+    ###########################################################
+    # Nodes searched beyond the leaves to play out pending captures
+    @property
+    def quiescence_nodes(self):
+        return self.nodes - self.interior_nodes - self.leaf_nodes
+
+    ###########################################################
+    # Share of the beta cutoffs caused by the first move, which tells how good the move ordering is
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    ###########################################################
+    # How many times more nodes the last iteration took than the previous one
+    @property
+    def branching_factor(self):
+        if len(self.iteration_nodes) < 2:
+            return 0.0
+        previous = self.iteration_nodes[-2] - (self.iteration_nodes[-3] if len(self.iteration_nodes) > 2 else 0)
+        return (self.iteration_nodes[-1] - self.iteration_nodes[-2]) / previous if previous else 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.time if self.time > 0 else 0.0
+
+    ###########################################################
+    # Function to return the statistics as a dict (derived values included), e.g. to be written as JSON
+    def as_dict(self):
+        return {"nodes": self.nodes, "interior_nodes": self.interior_nodes, "leaf_nodes": self.leaf_nodes,
+                "quiescence_nodes": self.quiescence_nodes, "tt_hits": self.tt_hits, "tt_cutoffs": self.tt_cutoffs,
+                "cutoffs": self.cutoffs, "first_move_cutoff_rate": round(self.first_move_cutoff_rate, 4),
+                "tablebase_hits": self.tablebase_hits, "depth": self.depth,
+                "iteration_times": [round(seconds, 4) for seconds in self.iteration_times],
+                "branching_factor": round(self.branching_factor, 2), "time": round(self.time, 4),
+                "nodes_per_second": round(self.nodes_per_second)}
 
-    # for single move
-    else:
-        output_final_move = []
+###########################################################
+# Function to return the progress line of a completed iteration, written by homework.py --verbose
+def search_progress_line(depth, score, principal_variation, stats):
+    return "depth %d score %d nodes %d time %.3fs nps %.0f ebf %.2f pv %s" % (
+        depth, score, stats.nodes, stats.time, stats.nodes_per_second, stats.branching_factor,
+        " ".join("-".join(str(position) for position in move) for move in principal_variation))
 
-        x1 = result[0][0]
-        y1 = result[0][1]
+###########################################################
+# Result of a search: the move to play, its value for the side that searched, the depth of the last completed
+# iteration, the principal variation (the line both sides are expected to play, starting with the move), the number
+# of nodes searched and the SearchStats of the search
+SearchResult = collections.namedtuple("SearchResult", ["move", "score", "depth", "principal_variation", "nodes",
+                                                       "stats"])
 
-        x2 = result[1][0]
-        y2 = result[1][1]
+###########################################################
+# Class holding everything a search needs between two moves: the transposition table, the killer moves and the
+# history scores. An Engine has no side effects outside of itself, so a program can use as many of them as it wants.
+# Positions are BitBoards, sides are 'b' or 'w' and moves are lists of serial positions (1-32), e.g. [9, 14].
+# seed, if given, makes the engine break ties between equally ranked moves randomly (but reproducibly), and pick
+# among the moves of the opening book according to their weights instead of always playing the heaviest one.
+# progress, if given, is called as progress(depth, score, principal_variation, stats) after every completed iteration
+# of a search, stats being the SearchStats of the search so far.
+class Engine:
+    def __init__(self, transposition_table_size_mb=TRANSPOSITION_TABLE_SIZE_MB, seed=None, tablebase=None,
+                 opening_book=None, progress=None):
+        self.transposition_table = TranspositionTable(transposition_table_size_mb)
+        self.tablebase = tablebase  # an EndgameTablebase (see tablebase.py) or None
+        self.opening_book = opening_book  # an OpeningBook (see opening_book.py) or None
+        self.tablebase_pieces = 0 if tablebase is None else tablebase.max_pieces
+        self.killer_moves = [[None, None] for ply in range(MAX_SEARCH_DEPTH + 1)]
+        self.history_table = [0] * HISTORY_TABLE_SIZE
+        self.move_ordering_random = None if seed is None else random.Random(seed)
+        self.progress = progress
+        self.search_deadline = float("inf")
+        self.search_stopped = False
+        self.last_search = None  # (position, side, SearchResult) of the last call to search()
+        self.ponder_thread = None
+        self.ponder_key = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self.reset_search_counters()
+        self.quiescence_nodes_left = 0
+        self.path_keys = []  # keys of the positions of the game history and of the search down to the current node
+        self.reversible_start = 0  # index in path_keys of the first position after the last capture or man move
+
+    ###########################################################
+    # Functions to reset, return and add to the counters of the current search (see SearchStats), which are returned
+    # as a tuple so that parallel workers can send theirs back
+    def reset_search_counters(self):
+        self.search_nodes = 0
+        self.interior_nodes = 0
+        self.leaf_nodes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tablebase_hits = 0
+
+    def search_counters(self):
+        return (self.search_nodes, self.interior_nodes, self.leaf_nodes, self.tt_hits, self.tt_cutoffs, self.cutoffs,
+                self.first_move_cutoffs, self.tablebase_hits)
+
+    def add_search_counters(self, counters):
+        self.search_nodes += counters[0]
+        self.interior_nodes += counters[1]
+        self.leaf_nodes += counters[2]
+        self.tt_hits += counters[3]
+        self.tt_cutoffs += counters[4]
+        self.cutoffs += counters[5]
+        self.first_move_cutoffs += counters[6]
+        self.tablebase_hits += counters[7]
+
+    ###########################################################
+    # Function to forget everything learnt about the previous game
+    def new_game(self):
+        self.transposition_table.clear()
+        self.history_table = [0] * HISTORY_TABLE_SIZE
+
+    ###########################################################
+    # Function to return all the legal moves of side in the position
+    def legal_moves(self, position, side):
+        return position.moves(side)
+
+    ###########################################################
+    # Function to return the move side should play in the position, searching for at most time_budget seconds
+    # history, if given, is the GameHistory of the game up to the position
+    def search(self, position, side, time_budget, history=None):
+        if self.ponder_thread is not None:
+            self.stop_pondering()
+            if position.key(side) == self.ponder_key:
+                self.ponder_hits += 1
+            else:
+                self.ponder_misses += 1
+
+        result = self.analyse(position, side, time_budget, history=history)
+        self.last_search = (position.copy(), side, result, history)
+        return result.move
+
+    ###########################################################
+    # Pondering
+    # While the enemy thinks about its reply to our last move, we search the position we expect after it (the reply
+    # predicted by the principal variation of our last search, or else the best move the transposition table knows for
+    # the enemy after our move) in a background thread, until the next call to search() stops it. The transposition
+    # table, killer moves and history scores are kept: on a ponder hit (the enemy played the predicted reply) the
+    # iterations already searched come straight out of the table and the search goes deeper than it could in its own
+    # time, on a miss the table still holds whatever the two positions share. The thread mostly runs while the main
+    # thread waits for the enemy's move, which doesn't hold the interpreter lock.
+    def start_pondering(self):
+        if self.last_search is None:
+            return
+        position, side, result, history = self.last_search
+        self.last_search = None
+        if result.move is None:
+            return
+
+        bitboard = position.copy()
+        history = GameHistory(bitboard, side) if history is None else history.copy()
+        history.play(bitboard, side, result.move)
+        enemy_color = enemys_color(side)
+        if len(result.principal_variation) > 1:
+            reply = result.principal_variation[1]
+        else:
+            entry = self.transposition_table.probe(bitboard.key(enemy_color))
+            reply = None if entry is None else entry[4]
+        if reply is None or reply not in bitboard.moves(enemy_color):
+            return
+
+        history.play(bitboard, enemy_color, reply)
+        if len(bitboard.moves(side)) == 0:
+            return
+
+        self.ponder_key = bitboard.key(side)
+        self.search_stopped = False
+        self.ponder_thread = threading.Thread(target=self.analyse, args=(bitboard, side),
+                                              kwargs={"history": history}, daemon=True)
+        self.ponder_thread.start()
+
+    ###########################################################
+    # Function to stop pondering (if the engine is) and wait for the background search to be over
+    def stop_pondering(self):
+        if self.ponder_thread is None:
+            return
+        self.search_stopped = True
+        self.search_deadline = 0
+        self.ponder_thread.join()
+        self.ponder_thread = None
+        self.search_stopped = False
+
+    ###########################################################
+    # Function to search the position for side and return a SearchResult
+    # Iterative deepening: the moves are searched to depth 1, 2, 3, ... and the result of the last iteration which was
+    # completed before running out of time is played. The search stops after max_depth, or when time_budget seconds
+    # have passed (None for no time limit). The position itself is left untouched.
+    # Positions of the opening book are not searched, the book move is played right away.
+    def analyse(self, position, side, time_budget=None, max_depth=MAX_SEARCH_DEPTH, history=None):
+        bitboard = position.copy()
+        moves = bitboard.moves(side)
+
+        # the search starts from the positions of the game since the last capture or man move
+        key = bitboard.key(side)
+        self.path_keys = list(history.keys) if history is not None and history.keys[-1:] == [key] else [key]
+        self.reversible_start = 0
+
+        if len(moves) == 0:
+            return SearchResult(None, -WIN_SCORE, 0, [], 0, SearchStats())
+
+        # if only one move is possible, return that
+        if len(moves) == 1:
+            return SearchResult(moves[0], 0, 0, [moves[0]], 0, SearchStats())
+
+        if self.opening_book is not None:
+            move = self.opening_book.probe(bitboard, side, self.move_ordering_random)
+            if move is not None:
+                return SearchResult(move, 0, 0, [move], 0, SearchStats())
+
+        # get the enemy's color
+        enemy_color = enemys_color(side)
+
+        start_time = time.time()
+        self.reset_search_counters()
+        self.new_search()
+        iteration_times = []
+        iteration_nodes = []
+
+        # the first iteration is always completed, so that there is a move to play however short the clock is
+        self.search_deadline = float("inf")
+        best_move, best, principal_variation = self.search_root(bitboard, moves, side, enemy_color, 1)
+        depth_reached = 1
+        self.iteration_completed(1, best, principal_variation, start_time, iteration_times, iteration_nodes)
+        if time_budget is not None:
+            self.search_deadline = start_time + time_budget
+
+        for depth in range(2, max_depth + 1):
+            # an iteration takes a few times longer than the previous one, so don't start one we are unlikely to
+            # complete
+            if time_budget is not None and time.time() - start_time > time_budget / 6:
+                break
+            if self.search_stopped:  # pondering was stopped (during the first iteration)
+                break
+
+            try:
+                best_move, best, principal_variation = self.search_root(bitboard, moves, side, enemy_color, depth)
+            except SearchTimeout:
+                break  # the aborted iteration left moves made on bitboard, it is not used anymore
+            depth_reached = depth
+            self.iteration_completed(depth, best, principal_variation, start_time, iteration_times, iteration_nodes)
+
+        self.search_deadline = float("inf")
+
+        stats = SearchStats(self.search_counters(), depth_reached, iteration_times, iteration_nodes,
+                            time.time() - start_time)
+        return SearchResult(best_move, best, depth_reached, principal_variation, self.search_nodes, stats)
+
+    ###########################################################
+    # Function to record the time and nodes used when an iteration of analyse() is completed and report its progress
+    def iteration_completed(self, depth, score, principal_variation, start_time, iteration_times, iteration_nodes):
+        iteration_times.append(time.time() - start_time)
+        iteration_nodes.append(self.search_nodes)
+        if self.progress is not None:
+            self.progress(depth, score, principal_variation,
+                          SearchStats(self.search_counters(), depth, iteration_times, iteration_nodes,
+                                      iteration_times[-1]))
+
+    ###########################################################
+    # Function to be called at the start of every new search
+    # Killer moves are tied to the previous position, while history scores are only aged so that recent ones count
+    # most. Entries of the transposition table from previous searches become replaceable.
+    def new_search(self):
+        self.transposition_table.new_search()
+
+        for killers in self.killer_moves:
+            killers[0] = None
+            killers[1] = None
+
+        history_table = self.history_table
+        for i in range(len(history_table)):
+            history_table[i] >>= 1
+
+    ###########################################################
+    # Function to return the moves of the side color, sorted from the most to the least promising
+    def order_moves(self, moves, color, hash_move, ply):
+        first_killer, second_killer = self.killer_moves[ply]
+        history_table = self.history_table
+        move_ordering_random = self.move_ordering_random
+
+        def rank(move):
+            if move == hash_move:
+                value = HASH_MOVE_SCORE
+            elif abs(move[1] - move[0]) > 5:  # a capture (all the moves are, since capturing is mandatory)
+                value = CAPTURE_SCORE + (len(move) - 1 << 32) + history_table[history_index(color, move)]
+            elif move == first_killer:
+                value = KILLER_MOVE_SCORES[0]
+            elif move == second_killer:
+                value = KILLER_MOVE_SCORES[1]
+            else:
+                value = history_table[history_index(color, move)]
+
+            if move_ordering_random is not None:
+                value += move_ordering_random.random()
+            return value
+
+        # sorting is stable, so moves of equal rank stay in generation order
+        return sorted(moves, key=rank, reverse=True)
+
+    ###########################################################
+    # Function to order the moves of the root of a search: the hash move (the best move of the previous iteration)
+    # first, then the others in generation order, or in random order if the engine has a seed
+    # The history scores are left out, so that the parallel search, whose history is spread among its workers, orders
+    # the root moves like the serial search, and so breaks ties between them the same way.
+    def order_root_moves(self, moves, hash_move):
+        move_ordering_random = self.move_ordering_random
+
+        def rank(move):
+            return move != hash_move, 0 if move_ordering_random is None else move_ordering_random.random()
+
+        return sorted(moves, key=rank)
+
+    ###########################################################
+    # Function to remember a move of color which caused a cutoff at ply, remaining depth moves away from the leaves
+    def record_cutoff(self, move, color, depth, ply):
+        if abs(move[1] - move[0]) <= 5:  # captures are ranked first anyway, so only quiet moves become killers
+            killers = self.killer_moves[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        self.history_table[history_index(color, move)] += depth * depth
+
+    ###########################################################
+    # Functions to add the position reached by a move of the search (color to move, undo being the record make_move
+    # returned) to the path of positions, and to take it off again given what enter_position returned
+    def enter_position(self, bitboard, color, undo):
+        reversible_start = self.reversible_start
+        if irreversible_move(bitboard, undo):
+            self.reversible_start = len(self.path_keys)
+        self.path_keys.append(bitboard.key(color))
+        return reversible_start
+
+    def leave_position(self, reversible_start):
+        self.path_keys.pop()
+        self.reversible_start = reversible_start
+
+    ###########################################################
+    # Function to return the value of a leaf position for color, the side to move, once all the pending captures are
+    # played
+    def quiescence(self, bitboard, color, alpha, beta, ply):
+        self.search_nodes += 1
+        if self.search_nodes % TIME_CHECK_INTERVAL == 0 and time.time() > self.search_deadline:
+            raise SearchTimeout()
+
+        if self.quiescence_nodes_left <= 0 or ply >= MAX_SEARCH_DEPTH:
+            return static_evaluation(bitboard, color)
+        captures = bitboard.captures(color)
+        if len(captures) == 0:
+            # a side which can neither capture nor move (no pieces left, or all of them blocked) has lost
+            if not bitboard.movers(color):
+                return ply - WIN_SCORE
+            return static_evaluation(bitboard, color)
+
+        self.quiescence_nodes_left -= 1
+        enemy_color = enemys_color(color)
+        best = -INFINITE_SCORE
+
+        # longest capture sequences first
+        for move in sorted(captures, key=len, reverse=True):
+            undo = bitboard.make_move(move)
+            value = -self.quiescence(bitboard, enemy_color, -beta, -alpha, ply + 1)
+            bitboard.unmake_move(undo)
+
+            if value > best:
+                best = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        return best
+
+    ###########################################################
+    # Evaluation function (Negamax with principal variation search)
+    # Returns the value of the position for color, the side to move, searched to the given depth (depth 1 is a leaf).
+    # The value of a position for one side is minus its value for the other, so the same code serves both sides.
+    # bitboard is a BitBoard, the whole search runs on this single board by making and unmaking every move in place
+    # ply is the number of moves made since the root of the search
+    # pv is filled with the best line found from this position when its value is within (alpha, beta)
+    # The first (best ordered) move is searched with the full window. Every other move is only tested against a null
+    # window (alpha, alpha + 1), which is cheap to refute, and searched again with the full window if it turns out
+    # better.
+    def evaluation(self, bitboard, color, depth, alpha, beta, ply, pv):
+        # a position already met since the last capture or man move, in the game or on the way here, is a draw (see
+        # GameHistory), and so is any position after NO_PROGRESS_PLIES plies without progress
+        path_keys = self.path_keys
+        reversible_start = self.reversible_start
+        if len(path_keys) - reversible_start > 4:
+            if len(path_keys) - 1 - reversible_start >= NO_PROGRESS_PLIES:
+                return 0
+            key = path_keys[-1]
+            for i in range(len(path_keys) - 5, reversible_start - 1, -2):  # same side to move, 4 plies back or more
+                if path_keys[i] == key:
+                    return 0
+
+        # positions with few enough pieces are looked up in the endgame tablebase, which knows their exact value
+        if self.tablebase_pieces and bit_count(bitboard.black | bitboard.white) <= self.tablebase_pieces:
+            result = self.tablebase.probe(bitboard, color)
+            if result is not None:
+                self.tablebase_hits += 1
+                outcome, plies = result
+                if outcome > 0:
+                    return WIN_SCORE - ply - plies
+                if outcome < 0:
+                    return ply + plies - WIN_SCORE
+                return 0
+
+        if depth <= 1:  # leaf node, its value is only taken once the pending captures are played
+            self.leaf_nodes += 1
+            self.quiescence_nodes_left = QUIESCENCE_NODE_BUDGET
+            return self.quiescence(bitboard, color, alpha, beta, ply)
+
+        self.search_nodes += 1
+        if self.search_nodes % TIME_CHECK_INTERVAL == 0 and time.time() > self.search_deadline:
+            raise SearchTimeout()
+        self.interior_nodes += 1
+
+        # look the position up in the transposition table
+        key = bitboard.key(color)
+        hash_move = None
+        entry = self.transposition_table.probe(key)
+        if entry is not None:
+            self.tt_hits += 1
+            hash_move = entry[4]
+            if entry[1] >= depth:
+                score = score_from_table(entry[2], ply)
+                bound = entry[3]
+                if bound == EXACT_BOUND or (bound == LOWER_BOUND and score >= beta) or (
+                        bound == UPPER_BOUND and score <= alpha):
+                    self.tt_cutoffs += 1
+                    return score
+
+        moves = bitboard.moves(color)
+        if len(moves) == 0:  # no move left, we have lost
+            return ply - WIN_SCORE
+
+        moves = self.order_moves(moves, color, hash_move, ply)
+        enemy_color = enemys_color(color)
+        alpha_original = alpha
+        best = -INFINITE_SCORE
+        best_move = None
 
-        letter_move = notations["{0}".format(y1)]
-        output_move = "E" + " " + letter_move + "{0}".format(8 - x1)
-        output_final_move.append(output_move)
+        for move in moves:
+            child_pv = []
+            undo = bitboard.make_move(move)
+            reversible_start = self.enter_position(bitboard, enemy_color, undo)
+            if best_move is None:
+                value = -self.evaluation(bitboard, enemy_color, depth - 1, -beta, -alpha, ply + 1, child_pv)
+            else:
+                value = -self.evaluation(bitboard, enemy_color, depth - 1, -alpha - 1, -alpha, ply + 1, child_pv)
+                if alpha < value < beta:
+                    child_pv = []
+                    value = -self.evaluation(bitboard, enemy_color, depth - 1, -beta, -alpha, ply + 1, child_pv)
+            self.leave_position(reversible_start)
+            bitboard.unmake_move(undo)
+
+            if value > best:
+                best = value
+                best_move = move
+                if value > alpha:
+                    alpha = value
+                    pv[:] = [move] + child_pv
+                    if alpha >= beta:  # the enemy will not allow this position, the remaining moves need no search
+                        self.cutoffs += 1
+                        if move is moves[0]:
+                            self.first_move_cutoffs += 1
+                        self.record_cutoff(move, color, depth, ply)
+                        break
+
+        if best >= beta:
+            bound = LOWER_BOUND
+        elif best <= alpha_original:
+            bound = UPPER_BOUND
+        else:
+            bound = EXACT_BOUND
+        self.transposition_table.store(key, depth, score_to_table(best, ply), bound, best_move)
+
+        return best
+
+    ###########################################################
+    # Function to search all our moves to the given depth (1st level of the search)
+    # Returns the best move, its value and the principal variation
+    # Among moves of the same value, the first one which forms a defensive structure (see defensive_move()) is
+    # preferred, otherwise the first one. A tie is only decided on exact values: a move which could take the place of
+    # the best one on a tie is searched by search_root_move() until its value is known to be equal, better or worse.
+    def search_root(self, bitboard, moves, color, enemy_color, depth):
+        best = -INFINITE_SCORE
+        alpha = -INFINITE_SCORE
+        beta = INFINITE_SCORE
+        best_move = None
+        best_defensive = False
+        principal_variation = []
+        us = bitboard.black if color == 'b' else bitboard.white
+
+        # the best move of the previous iteration is searched first, it gives the best bound for the others
+        key = bitboard.key(color)
+        entry = self.transposition_table.probe(key)
+        moves = self.order_root_moves(moves, None if entry is None else entry[4])
 
-        letter_last_position_move = notations["{0}".format(y2)]
-        output_last_position_move = "E" + " " + letter_last_position_move + "{0}".format(8 - x2)
+        for move in moves:
+            child_pv = []
+            breaks_tie = best_move is not None and not best_defensive and defensive_move(us, move)
+            undo = bitboard.make_move(move)
+            reversible_start = self.enter_position(bitboard, enemy_color, undo)
+            if best_move is None:
+                move_val = -self.evaluation(bitboard, enemy_color, depth, -beta, -alpha, 1, child_pv)
+            else:
+                move_val = self.search_root_move(bitboard, enemy_color, depth, alpha, beta, child_pv, breaks_tie)
+            self.leave_position(reversible_start)
+            bitboard.unmake_move(undo)
+
+            if move_val > best or (breaks_tie and move_val == best):
+                best_move = move
+                best_defensive = defensive_move(us, move)
+                best = move_val
+                principal_variation = [move] + child_pv
+            if best > alpha:
+                alpha = best
+
+        self.transposition_table.store(key, depth + 1, best, EXACT_BOUND, best_move)
+
+        return best_move, best, principal_variation
+
+    ###########################################################
+    # Function to search a root move after the first one (the move is made on bitboard, enemy_color to move), alpha
+    # being the value of the best move so far
+    # Like in evaluation(), the move is first tested against the null window (alpha, alpha + 1), which is cheap to
+    # refute, and searched again with the full window if it turns out better. The value returned is then exact if it
+    # is above alpha, and only an upper bound otherwise. A fail-low at alpha can't tell a move as good as the best one
+    # from a worse one, so if exact_at_alpha is True the move is tested against (alpha - 1, alpha) first, and the
+    # value returned is exact if it is at least alpha (alpha itself if both tests fail on it).
+    def search_root_move(self, bitboard, enemy_color, depth, alpha, beta, pv, exact_at_alpha=False):
+        if exact_at_alpha:
+            value = -self.evaluation(bitboard, enemy_color, depth, -alpha, 1 - alpha, 1, pv)
+            if value < alpha:
+                return value
+
+        value = -self.evaluation(bitboard, enemy_color, depth, -alpha - 1, -alpha, 1, pv)
+        if value <= alpha:
+            return alpha if exact_at_alpha else value
+
+        return -self.evaluation(bitboard, enemy_color, depth, -beta, -alpha, 1, pv)
 
-        output_final_move.append(output_last_position_move)
+###########################################################
+# Parallel search
+# Python threads cannot search at the same time, so the root moves are shared among worker processes, each with its
+# own Engine (and tables) which it keeps from one search to the next. The first (best ordered) move is searched by the
+# main process alone, to get a good alpha for the others ("young brothers wait"), then every other root move is given
+# to a worker. The best value found so far is shared through parallel_shared_alpha, so that moves given out later are
+# searched against the latest bound. Workers get the exact value of every move at least as good as alpha (whichever
+# move finishes first, any other could still tie with it), so the results can be merged in the order of the moves
+# with the same rule as Engine.search_root, which gives the move the serial search would return at the same depth.
+PARALLEL_MIN_DEPTH = 4  # shallower iterations are too quick to be worth handing out to other processes
+
+parallel_worker_engine = None
+parallel_worker_game = None
+parallel_worker_search = None
+parallel_shared_alpha = None
 
-        output_to_be_written_to_file_move = output_final_move[0] + " " + output_final_move[1].replace("E",
-                                                                                                      "").replace(
-            " ", "")
-        print(output_to_be_written_to_file_move, end="", file=fp)
+###########################################################
+# Function run once in every worker process when it starts
+# Every worker maps the tablebase file (if any) itself, the operating system keeps a single copy of it in memory, and
+# gets the evaluation weights of the engine which started it
+def init_parallel_worker(shared_alpha, transposition_table_size_mb, tablebase_path, weights):
+    global parallel_worker_engine, parallel_shared_alpha
+    set_evaluation_weights(weights)
+    tablebase = None
+    if tablebase_path is not None:
+        import tablebase as tablebase_module
+        tablebase = tablebase_module.EndgameTablebase(tablebase_path)
+    parallel_worker_engine = Engine(transposition_table_size_mb, tablebase=tablebase)
+    parallel_shared_alpha = shared_alpha
 
-# for 'game' mode
-if game_type == 'GAME':
-    serial_result, final_board_after_move = play_game()
+###########################################################
+# Function run in a worker process to search one root move
+# task is (black, white, kings, side, move, depth, deadline, game_id, search_id, path keys of the root) and the result
+# is None if the deadline passed, otherwise (value, exact, principal variation, search counters): value is exact if
+# exact is True and is only known to be worse than the best move otherwise
+def parallel_search_root_move(task):
+    global parallel_worker_game, parallel_worker_search
+    black, white, kings, side, move, depth, deadline, game_id, search_id, path_keys = task
+    engine = parallel_worker_engine
+
+    if game_id != parallel_worker_game:
+        engine.new_game()
+        parallel_worker_game = game_id
+    if search_id != parallel_worker_search:
+        engine.new_search()
+        parallel_worker_search = search_id
+
+    bitboard = BitBoard(black, white, kings)
+    enemy_color = enemys_color(side)
+    alpha = parallel_shared_alpha.value
+    engine.search_deadline = deadline
+    engine.reset_search_counters()
+    engine.path_keys = list(path_keys)
+    engine.reversible_start = 0
+    child_pv = []
+
+    undo = bitboard.make_move(move)
+    engine.enter_position(bitboard, enemy_color, undo)
+    try:
+        # anything at least as good as alpha gets its exact value, as any move could be the best one or tie with it
+        value = engine.search_root_move(bitboard, enemy_color, depth, alpha, INFINITE_SCORE, child_pv, True)
+        exact = value >= alpha
+    except SearchTimeout:
+        return None
+
+    if exact:
+        with parallel_shared_alpha.get_lock():
+            if value > parallel_shared_alpha.value:
+                parallel_shared_alpha.value = value
+
+    return value, exact, [move] + child_pv, engine.search_counters()
 
-    for row in final_board_after_move:
-        for element in row:
-            sys.stdout.write(element[0])
-        sys.stdout.write('\n')
+###########################################################
+# Class of an Engine which shares the root moves of its searches among workers processes
+# It is used like an Engine, but should be closed (or used in a with statement) to stop the processes.
+class ParallelEngine(Engine):
+    def __init__(self, workers=None, transposition_table_size_mb=TRANSPOSITION_TABLE_SIZE_MB, seed=None,
+                 tablebase=None, opening_book=None, progress=None):
+        Engine.__init__(self, transposition_table_size_mb, seed, tablebase, opening_book, progress)
+        self.shared_alpha = multiprocessing.Value("q", -INFINITE_SCORE)
+        self.pool = multiprocessing.Pool(workers, init_parallel_worker,
+                                         (self.shared_alpha, transposition_table_size_mb,
+                                          None if tablebase is None else tablebase.path, evaluation_weights()))
+        self.game_id = 0
+        self.search_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    ###########################################################
+    # Function to stop the worker processes
+    def close(self):
+        self.stop_pondering()
+        self.pool.terminate()
+        self.pool.join()
+
+    ###########################################################
+    # Function to forget everything learnt about the previous game, in the workers too
+    def new_game(self):
+        Engine.new_game(self)
+        self.game_id += 1
+
+    ###########################################################
+    # Function to be called at the start of every new search
+    def new_search(self):
+        Engine.new_search(self)
+        self.search_id += 1
+
+    ###########################################################
+    # Function to search all our moves to the given depth, the same as Engine.search_root but with the moves after the
+    # first one searched by the worker processes
+    # Raises SearchTimeout if any of them could not complete its search before the deadline
+    # Pondering searches in this process only, as a worker can't be stopped before its move is searched
+    def search_root(self, bitboard, moves, color, enemy_color, depth):
+        if depth < PARALLEL_MIN_DEPTH or self.ponder_thread is not None:
+            return Engine.search_root(self, bitboard, moves, color, enemy_color, depth)
+
+        key = bitboard.key(color)
+        entry = self.transposition_table.probe(key)
+        moves = self.order_root_moves(moves, None if entry is None else entry[4])
+        us = bitboard.black if color == 'b' else bitboard.white
+
+        # the eldest brother
+        child_pv = []
+        undo = bitboard.make_move(moves[0])
+        reversible_start = self.enter_position(bitboard, enemy_color, undo)
+        best = -self.evaluation(bitboard, enemy_color, depth, -INFINITE_SCORE, INFINITE_SCORE, 1, child_pv)
+        self.leave_position(reversible_start)
+        bitboard.unmake_move(undo)
+        best_move = moves[0]
+        best_defensive = defensive_move(us, best_move)
+        principal_variation = [best_move] + child_pv
+
+        # the young brothers
+        self.shared_alpha.value = best
+        tasks = [(bitboard.black, bitboard.white, bitboard.kings, color, move, depth, self.search_deadline,
+                  self.game_id, self.search_id, tuple(self.path_keys)) for move in moves[1:]]
+        results = self.pool.map(parallel_search_root_move, tasks, chunksize=1)
+
+        for move, result in zip(moves[1:], results):
+            if result is None:
+                raise SearchTimeout()
+
+            move_val, exact, move_pv, counters = result
+            self.add_search_counters(counters)
+            if exact and (move_val > best or (move_val == best and not best_defensive and defensive_move(us, move))):
+                best_move = move
+                best_defensive = defensive_move(us, move)
+                best = move_val
+                principal_variation = move_pv
+
+        self.transposition_table.store(key, depth + 1, best, EXACT_BOUND, best_move)
+
+        return best_move, best, principal_variation
 
-    result = []
-    for position in serial_result:
-        position = serial_position_to_grid_position(position)
-        result.append(position)
+###########################################################
+# Function for 'single' mode
+# Returns any possible valid move (jump over single move)
+def play_single(board, color_play):
+    if color_play == 'BLACK':
+        color = 'b'
+    else:
+        color = 'w'
 
-    # for single/multiple jumps
-    x1 = result[0][0]
-    y1 = result[0][1]
+    # the moves of the generator are legal as they are, and as capturing is mandatory they are all jumps if any jump
+    # is possible
+    moves = BitBoard.from_grid(board).moves(color)
+    if len(moves) == 0:
+        return None
 
-    x2 = result[1][0]
-    y2 = result[1][1]
+    # a random move out of all the moves possible
+    return moves[random.randint(0, len(moves) - 1)]
 
-    if (abs(x1 - x2) == 2 and abs(y1 - y2) == 2):
-        output_final_jumps = []
+###########################################################
+# Function for 'game' mode
+# Returns the best possible valid move, searched by engine within the time we can spend on it, and the board after it
+# history, if given, is the GameHistory of the game up to the board
+def play_game(board, color_play, time_remaining, engine, history=None):
+    if color_play == 'BLACK':
+        color = 'b'
+    else:
+        color = 'w'
 
-        for i in range(0, len(result) - 1):
-            x1 = result[i][0]
-            y1 = result[i][1]
+    bitboard = BitBoard.from_grid(board)
+    next_move_to_be_returned = engine.search(bitboard, color, move_time_budget(bitboard, color, time_remaining),
+                                             history)
+    if next_move_to_be_returned is None:  # no move left
+        return None
 
-            letter_jumps = notations["{0}".format(y1)]
-            output_jumps = "J" + " " + letter_jumps + "{0}".format(8 - x1)
+    # the engine only plays moves of the move generator (see Move legality)
+    assert is_legal_move(bitboard, color, next_move_to_be_returned)
+    bitboard.make_move(next_move_to_be_returned)
 
-            output_final_jumps.append(output_jumps)
+    return next_move_to_be_returned, bitboard.to_grid()
 
-        letter_last_position_jumps = notations["{0}".format(result[len(result) - 1][1])]
-        output_last_position_jumps = "J" + " " + letter_last_position_jumps + "{0}".format(
-            8 - result[len(result) - 1][0])
-        output_final_jumps.append(output_last_position_jumps)
+###########################################################
+# Game history in input.txt
+# In 'game' mode, the board may be followed by a line giving the moves of the game so far from the initial position,
+# in serial positions joined by '-', so that the engine knows the positions already played (see GameHistory):
+#   HISTORY 11-15 23-19 8-11 22-17
+# or by a line giving a file holding these moves, in the same format:
+#   HISTORY_FILE game.txt
+# The last move of the enemy can be left out, it is found from the board. The file is rewritten with the moves of the
+# game up to our move, so that it keeps the history from one run to the next; a missing file, or one left from an
+# earlier game, is taken as a new game. A history which doesn't lead to the board is ignored.
+HISTORY_LINE = "HISTORY"
+HISTORY_FILE_LINE = "HISTORY_FILE"
 
-        output_final_jumps_final = []
-        output_final_jumps_final.append(output_final_jumps[0])
+###########################################################
+# Function to return (GameHistory or None, moves of the game up to the board, path of the history file or None) from
+# the lines following the board in an input.txt file
+def read_input_history(lines, board, color):
+    text = None
+    path = None
+    for line in lines:
+        fields = line.split(None, 1)
+        if len(fields) > 0 and fields[0] == HISTORY_LINE:
+            text = fields[1] if len(fields) > 1 else ""
+        elif len(fields) > 1 and fields[0] == HISTORY_FILE_LINE:
+            path = fields[1].strip()
+            try:
+                with open(path) as history_file:
+                    text = history_file.read()
+            except OSError:  # no history yet, or one which can't be read
+                text = ""
+
+    if text is None:
+        return None, None, None
+
+    # moves which can't be read are a history which doesn't lead to the board
+    try:
+        moves = [[int(position) for position in move.split('-')] for move in text.split()]
+    except ValueError:
+        moves = None
+
+    bitboard = BitBoard.from_grid(board)
+    history = None if moves is None else replay_game_history(moves, bitboard, color)
+    if history is None and path is not None:
+        moves = []
+        history = replay_game_history(moves, bitboard, color)
+    return history, moves, path
 
-        # if our piece becomes a king during one of the moves, we have to stop
-        i = 1
-        while i < (len(output_final_jumps)):
-            if color_play == 'BLACK':
-                char_to_be_checked = '1'
-                if output_final_jumps[i][3] == char_to_be_checked:
-                    output_final_jumps_final.append(output_final_jumps[i])
-                    break
-                else:
-                    output_final_jumps_final.append(output_final_jumps[i])
+###########################################################
+# Function to play one move given the lines of an input.txt file, writing the output.txt lines to fp
+# engine searches the move in 'game' mode, after which the board after our move is written to board_stream
+def play_from_input(input_file_string, fp, engine, board_stream=sys.stdout):
+    game_type = input_file_string[0].strip()
+    color_play = input_file_string[1].strip()
+    time_remaining = float(input_file_string[2])
+    if game_type not in ('SINGLE', 'GAME') or color_play not in ('BLACK', 'WHITE'):
+        raise ValueError("%r %r is not a mode and a color" % (game_type, color_play))
+
+    board = [list(input_file_string[3 + i].strip()) for i in range(8)]
+
+    # for 'single' mode
+    if game_type == 'SINGLE':
+        move = play_single(board, color_play)
+
+    # for 'game' mode
+    if game_type == 'GAME':
+        history, history_moves, history_path = read_input_history(input_file_string[11:], board,
+                                                                  'b' if color_play == 'BLACK' else 'w')
+        move, final_board_after_move = play_game(board, color_play, time_remaining, engine, history) or (None, board)
+
+    if move is not None:  # with no move left (the game is lost), output.txt stays empty
+        write_move(fp, move)
+
+    if game_type == 'GAME':
+        board_stream.write("".join("".join(row) + "\n" for row in final_board_after_move))
+
+        # the move is already written, a history file which can't be written only costs the draw detection
+        if move is not None and history_path is not None and history is not None:
+            try:
+                with open(history_path, "w") as history_file:
+                    history_file.write(" ".join("-".join(str(position) for position in history_move)
+                                                for history_move in history_moves + [move]) + "\n")
+            except OSError as error:
+                sys.stderr.write("history file not written: %s\n" % error)
 
-            elif color_play == 'WHITE':
-                char_to_be_checked = '8'
-                if output_final_jumps[i][3] == char_to_be_checked:
-                    output_final_jumps_final.append(output_final_jumps[i])
-                    break
-                else:
-                    output_final_jumps_final.append(output_final_jumps[i])
+###########################################################
+# Server mode
+# The engine stays alive between moves so that the interpreter start-up is paid once and the transposition table and
+# history scores stay warm from one move to the next. The protocol is line based:
+#   - the 11 lines of an input.txt file followed by a line "go": the engine answers with the lines of the output.txt
+#     file followed by a line "end" (in 'game' mode the board after the move goes to the standard error)
+#   - "newgame": forget everything learnt about the previous game, answered by "end"
+#   - "quit": stop the engine (or close the connection when using a socket)
+# A request which is not a valid input.txt file is answered by a line "error <reason>" followed by "end", and the
+# engine goes on serving the next requests.
+# With pondering, the engine keeps searching on the enemy's time after every answer (see Engine.start_pondering()).
+SERVER_END_OF_ANSWER = "end"
+SERVER_ERROR = "error"
 
-            i += 1
+###########################################################
+# Function to answer the requests read from input_stream on output_stream with engine, until "quit" or the end of the
+# input
+def run_server(input_stream, output_stream, engine, ponder=False):
+    input_lines = []
+
+    for line in input_stream:
+        command = line.strip()
+
+        if command == "quit":
+            break
+
+        if command == "newgame":
+            engine.stop_pondering()
+            engine.new_game()
+            input_lines = []
+            output_stream.write(SERVER_END_OF_ANSWER + "\n")
+        elif command == "go":
+            answer = io.StringIO()
+            try:
+                play_from_input(input_lines, answer, engine, sys.stderr)
+                played = True
+            except (ValueError, IndexError) as error:
+                answer = io.StringIO("%s %s" % (SERVER_ERROR, error))
+                played = False
+            input_lines = []
+            output_stream.write(answer.getvalue().rstrip("\n") + "\n" + SERVER_END_OF_ANSWER + "\n")
+            output_stream.flush()
+            if ponder and played:
+                engine.start_pondering()
+        elif command != "" or len(input_lines) > 0:
+            input_lines.append(command)
+
+        output_stream.flush()
+
+    engine.stop_pondering()
 
-        for i in range(0, len(output_final_jumps_final) - 1):
-            output_to_be_written_to_file_jumps = output_final_jumps_final[i] + " " + output_final_jumps_final[
-                i + 1].replace("J", "").replace(" ", "")
-            print(output_to_be_written_to_file_jumps, '\n', end="", file=fp)
+###########################################################
+# Class handling one client of the server on a Unix socket, the clients are served one after another by the same engine
+# The engine is given to the server as its engine attribute, and whether to ponder as its ponder attribute
+class EngineRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        run_server(io.TextIOWrapper(self.rfile, encoding="ascii"), io.TextIOWrapper(self.wfile, encoding="ascii"),
+                   self.server.engine, self.server.ponder)
 
-    # for single move
+###########################################################
+# read input
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checkers engine: reads input.txt and writes our move to output.txt")
+    parser.add_argument("--server", action="store_true",
+                        help="keep running and answer requests on the standard input/output instead")
+    parser.add_argument("--socket", metavar="PATH", help="with --server, listen on this Unix socket instead")
+    parser.add_argument("--ponder", action="store_true",
+                        help="with --server, keep searching on the enemy's time after every answer")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes searching in parallel (default: 1, no parallel search)")
+    parser.add_argument("--tablebase", metavar="PATH", help="endgame tablebase generated by tablebase.py")
+    parser.add_argument("--book", metavar="PATH", help="opening book generated by opening_book.py")
+    parser.add_argument("--weights", metavar="PATH", help="evaluation weights generated by tuner.py")
+    parser.add_argument("--verbose", action="store_true",
+                        help="write a progress line to the standard error after every iteration of the search")
+    arguments = parser.parse_args()
+
+    if arguments.weights:
+        set_evaluation_weights(load_evaluation_weights(arguments.weights))
+
+    endgame_tablebase = None
+    if arguments.tablebase:
+        import tablebase
+        endgame_tablebase = tablebase.EndgameTablebase(arguments.tablebase)
+
+    book = None
+    if arguments.book:
+        import opening_book
+        book = opening_book.OpeningBook(arguments.book)
+
+    progress = None
+    if arguments.verbose:
+        def progress(depth, score, principal_variation, stats):
+            sys.stderr.write(search_progress_line(depth, score, principal_variation, stats) + "\n")
+
+    if arguments.workers > 1:
+        engine = ParallelEngine(arguments.workers, tablebase=endgame_tablebase, opening_book=book, progress=progress)
     else:
-        output_final_move = []
-
-        x1 = result[0][0]
-        y1 = result[0][1]
-
-        x2 = result[1][0]
-        y2 = result[1][1]
-
-        letter_move = notations["{0}".format(y1)]
-        output_move = "E" + " " + letter_move + "{0}".format(8 - x1)
-        output_final_move.append(output_move)
-
-        letter_last_position_move = notations["{0}".format(y2)]
-        output_last_position_move = "E" + " " + letter_last_position_move + "{0}".format(8 - x2)
+        engine = Engine(tablebase=endgame_tablebase, opening_book=book, progress=progress)
+
+    if arguments.server and arguments.socket:
+        with socketserver.UnixStreamServer(arguments.socket, EngineRequestHandler) as server:
+            server.engine = engine
+            server.ponder = arguments.ponder
+            server.serve_forever()
+    elif arguments.server:
+        run_server(sys.stdin, sys.stdout, engine, arguments.ponder)
+    else:
+        input_file = open("input.txt")
+        input_file_string = input_file.read().split('\n')
 
-        output_final_move.append(output_last_position_move)
+        # Play
+        with open("output.txt", "w") as fp:
+            play_from_input(input_file_string, fp, engine)
 
-        output_to_be_written_to_file_move = output_final_move[0] + " " + output_final_move[1].replace("E",
-                                                                                                      "").replace(
-            " ", "")
-        print(output_to_be_written_to_file_move, end="", file=fp)
-########################################################################################################################
\ No newline at end of file
+    if arguments.workers > 1:
+        engine.close()
+########################################################################################################################
@@ -0,0 +1,237 @@
+########################################################################################################################
+# Opening book
+# Builds a book of the moves to play in the first positions of a game, from deep searches of the opening or from the
+# results of played games, and reads it back through mmap so that the engine plays these moves without searching.
+#
+# Usage: python opening_book.py [--plies N] [--depth D] [--games FILE] [--output FILE]
+# --games reads one game per line: the result ("1-0" black won, "0-1" white won, "1/2-1/2" draw) followed by the
+# moves as serial positions joined by '-', e.g. "1-0 11-15 23-19 8-11 22-17 ..." or "0-1 ... 22-15-6 ..."; a game
+# records file (see game_records.py) can be given instead.
+import argparse
+import mmap
+import struct
+import sys
+
+from game_records import GameRecords, is_game_records_file
+from homework import BitBoard, Engine, INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, enemys_color, is_legal_move, \
+    pack_move, unpack_move
+
+###########################################################
+# File format
+# A header (magic, version, number of entries) followed by the entries (position key, packed move, weight), sorted by
+# key and, for the same key, by decreasing weight. Keys are BitBoard.key() values, which don't change from one run to
+# the next, and moves are packed with pack_move().
+BOOK_MAGIC = b"CKOB"
+BOOK_VERSION = 1
+BOOK_HEADER = struct.Struct("<4sHI")
+BOOK_ENTRY = struct.Struct("<QQI")
+DEFAULT_BOOK_PLIES = 4
+DEFAULT_BOOK_DEPTH = 9
+DEFAULT_BOOK_FILE = "opening.book"
+
+# weight given to a move of a game by the game's result for the side which played it
+GAME_WIN_WEIGHT = 2
+GAME_DRAW_WEIGHT = 1
+GAME_RESULTS = {"1-0": 1, "0-1": -1, "1/2-1/2": 0}
+
+###########################################################
+# Function to return the initial position of a game, black moves first
+def initial_position():
+    return BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0)
+
+###########################################################
+# Class collecting weighted book moves in memory before they are written to a file
+class OpeningBookBuilder:
+    def __init__(self):
+        self.entries = {}  # key -> {packed move: weight}
+
+    ###########################################################
+    # Function to add weight to the move of color in the position
+    def add_move(self, bitboard, color, move, weight=1):
+        moves = self.entries.setdefault(bitboard.key(color), {})
+        packed = pack_move(move)
+        moves[packed] = moves.get(packed, 0) + weight
+
+    ###########################################################
+    # Function to add the book moves found by searching every position up to plies moves from the initial position to
+    # the given depth. Every move of every position is followed (not only the best ones), so that the book still
+    # knows what to do when the enemy plays something else.
+    def add_searched_positions(self, plies, depth, engine=None, log=sys.stderr):
+        if engine is None:
+            engine = Engine()
+
+        seen = set()
+        positions = [(initial_position(), 'b')]
+        for ply in range(plies):
+            next_positions = []
+            for bitboard, color in positions:
+                key = bitboard.key(color)
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                moves = bitboard.moves(color)
+                if len(moves) == 0:
+                    continue
+                result = engine.analyse(bitboard, color, max_depth=depth)
+                self.add_move(bitboard, color, result.move)
+
+                for move in moves:
+                    child = bitboard.copy()
+                    child.make_move(move)
+                    next_positions.append((child, enemys_color(color)))
+
+            log.write("ply %d: %d positions\n" % (ply + 1, len(seen)))
+            positions = next_positions
+
+    ###########################################################
+    # Function to add the first plies moves of a game played from the initial position, weighted by its result (1
+    # black won, -1 white won, 0 draw): the moves of the winner count for GAME_WIN_WEIGHT, those of a draw for
+    # GAME_DRAW_WEIGHT and those of the loser are left out
+    # Raises ValueError, before adding anything, if one of these moves is not legal
+    def add_game(self, moves, result, plies=DEFAULT_BOOK_PLIES):
+        bitboard = initial_position()
+        color = 'b'
+        book_moves = []
+
+        for ply, move in enumerate(moves[:plies]):
+            if not is_legal_move(bitboard, color, move):
+                raise ValueError("the move %r of ply %d is not legal" % (move, ply + 1))
+            if result == 0:
+                book_moves.append((bitboard.copy(), color, move, GAME_DRAW_WEIGHT))
+            elif result == (1 if color == 'b' else -1):
+                book_moves.append((bitboard.copy(), color, move, GAME_WIN_WEIGHT))
+            bitboard.make_move(move)
+            color = enemys_color(color)
+
+        for bitboard, color, move, weight in book_moves:
+            self.add_move(bitboard, color, move, weight)
+
+    ###########################################################
+    # Function to write the book to path
+    def write(self, path):
+        entries = []
+        for key, moves in self.entries.items():
+            for packed, weight in moves.items():
+                entries.append((key, -weight, packed))
+        entries.sort()
+
+        with open(path, "wb") as output:
+            output.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, len(entries)))
+            for key, weight, packed in entries:
+                output.write(BOOK_ENTRY.pack(key, packed, -weight))
+
+###########################################################
+# Class reading an opening book written by OpeningBookBuilder through mmap
+class OpeningBook:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as input_file:
+            self.data = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.count = BOOK_HEADER.unpack_from(self.data, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            raise ValueError("%s is not an opening book file" % path)
+
+    def close(self):
+        self.data.close()
+
+    ###########################################################
+    # Function to return the (packed move, weight) entries of a position key, heaviest first
+    # Binary search for the first entry of the key, its other entries follow it
+    def entries(self, key):
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            if BOOK_ENTRY.unpack_from(self.data, BOOK_HEADER.size + middle * BOOK_ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        entries = []
+        while low < self.count:
+            entry_key, packed, weight = BOOK_ENTRY.unpack_from(self.data, BOOK_HEADER.size + low * BOOK_ENTRY.size)
+            if entry_key != key:
+                break
+            entries.append((packed, weight))
+            low += 1
+        return entries
+
+    ###########################################################
+    # Function to return the book move of color in the position, or None if the position is not in the book
+    # The heaviest move is returned, unless a random.Random is given to choose among the moves by their weights
+    def probe(self, bitboard, color, random_generator=None):
+        entries = self.entries(bitboard.key(color))
+        if len(entries) == 0:
+            return None
+
+        packed = entries[0][0]
+        if random_generator is not None and len(entries) > 1:
+            choice = random_generator.uniform(0, sum(weight for packed, weight in entries))
+            for packed, weight in entries:
+                choice -= weight
+                if choice <= 0:
+                    break
+
+        # a move which is not legal in the position means that another position has the same key
+        return unpack_move(bitboard, color, packed)
+
+###########################################################
+# Function to return the (moves, result) of a line of a games file in the format described at the top of this file
+# Raises ValueError if the line is not a result followed by moves
+def parse_game(line):
+    fields = line.split()
+    if len(fields) == 0 or fields[0] not in GAME_RESULTS:
+        raise ValueError("%r is not a game result" % (fields[0] if fields else line))
+    try:
+        moves = [[int(position) for position in field.split('-')] for field in fields[1:]]
+    except ValueError:
+        raise ValueError("%r are not moves" % " ".join(fields[1:])) from None
+    return moves, GAME_RESULTS[fields[0]]
+
+###########################################################
+# Function to read the games of a file in the format described at the top of this file, as (moves, result) pairs
+# The games are read one at a time as they are needed, so that files of any size can be gone through. A line which
+# can't be parsed gives a (None, ValueError) pair instead, so that the caller can skip that game and go on with the
+# next ones.
+def read_games(path):
+    if is_game_records_file(path):
+        records = GameRecords(path)
+        yield from records.games()
+        records.close()
+        return
+
+    with open(path) as input_file:
+        for line in input_file:
+            if len(line.split()) == 0:
+                continue
+            try:
+                yield parse_game(line)
+            except ValueError as error:
+                yield None, error
+
+###########################################################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the opening book used by homework.py --book")
+    parser.add_argument("--plies", type=int, default=DEFAULT_BOOK_PLIES,
+                        help="number of moves from the initial position to cover (default: %d)" % DEFAULT_BOOK_PLIES)
+    parser.add_argument("--depth", type=int, default=DEFAULT_BOOK_DEPTH,
+                        help="depth of the searches, 0 to only use --games (default: %d)" % DEFAULT_BOOK_DEPTH)
+    parser.add_argument("--games", metavar="FILE", help="also add the moves of the games of this file")
+    parser.add_argument("--output", default=DEFAULT_BOOK_FILE, help="file to write (default: %s)" % DEFAULT_BOOK_FILE)
+    arguments = parser.parse_args()
+
+    builder = OpeningBookBuilder()
+    if arguments.depth > 0:
+        builder.add_searched_positions(arguments.plies, arguments.depth)
+    if arguments.games:
+        for number, (moves, result) in enumerate(read_games(arguments.games)):
+            try:
+                if moves is None:
+                    raise result
+                builder.add_game(moves, result, arguments.plies)
+            except ValueError as error:
+                sys.stderr.write("game %d skipped: %s\n" % (number + 1, error))
+    builder.write(arguments.output)
+########################################################################################################################
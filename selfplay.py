@@ -0,0 +1,285 @@
+########################################################################################################################
+# Self-play matches
+# Plays two versions of the engine (engine A and engine B, each given as the path of its homework.py) against each
+# other from a list of openings, every opening once with each color, over a pool of worker processes. Every side has
+# its own clock for the whole game, like time_remaining in input.txt, and loses when it runs out. Games are drawn by
+# threefold repetition, by NO_PROGRESS_PLIES plies without a capture or a man moving, or when they reach --max-plies.
+# The result is reported as the Elo difference of A over B with its 95% confidence interval, and with --sprt the match
+# stops as soon as the sequential probability ratio test can tell whether A is at least elo1 or at most elo0 better.
+#
+# Usage: python selfplay.py [--engine-a PATH] [--engine-b PATH] [--weights-a FILE] [--weights-b FILE] [--openings FILE]
+#                           [--games N] [--time SECONDS] [--workers N] [--sprt ELO0 ELO1] [--games-output FILE]
+#                           [--records FILE]
+# --openings reads one opening per line as moves from the initial position in serial positions joined by '-', e.g.
+# "11-15 23-19 8-11". Without it, every position two plies from the initial position is used. --games-output writes
+# the games in the format read by opening_book.py --games and tuner.py, and --records appends them to a game records
+# file (see game_records.py), which both of them also read. --weights-a and --weights-b give an engine the
+# evaluation weights of a file written by tuner.py, e.g. to play tuned weights against the default ones.
+import argparse
+import importlib.util
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+from game_records import GameRecordsWriter
+from homework import BitBoard, GameHistory, INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, NO_PROGRESS_PLIES, enemys_color, \
+    is_legal_move, legal_move_set
+
+DEFAULT_MAX_PLIES = 400
+DEFAULT_GAME_TIME = 10.0
+SPRT_ALPHA = 0.05
+SPRT_BETA = 0.05
+# smallest variance of the game scores taken by the statistics, the variance of a match between equal engines with
+# 96% of draws: a match of draws only would otherwise have no variance, and so give no information at all
+SCORE_VARIANCE_FLOOR = 0.01
+
+selfplay_engine_modules = None
+
+###########################################################
+# Function to import the engine module (a homework.py) at path under its own name, so that two versions of the same
+# file can be loaded side by side
+def load_engine_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.abspath(path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+###########################################################
+# Function run once in every worker process when it starts
+def init_selfplay_worker(engine_a_path, engine_b_path, weights_a_path=None, weights_b_path=None):
+    global selfplay_engine_modules
+    selfplay_engine_modules = (load_engine_module(engine_a_path, "selfplay_engine_a"),
+                               load_engine_module(engine_b_path, "selfplay_engine_b"))
+    for module, weights_path in zip(selfplay_engine_modules, (weights_a_path, weights_b_path)):
+        if weights_path is not None:
+            module.set_evaluation_weights(module.load_evaluation_weights(weights_path))
+
+###########################################################
+# Function to return the default openings, every sequence of two plies from the initial position
+def default_openings():
+    openings = []
+    bitboard = BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0)
+    for black_move in bitboard.moves('b'):
+        undo = bitboard.make_move(black_move)
+        for white_move in bitboard.moves('w'):
+            openings.append([black_move, white_move])
+        bitboard.unmake_move(undo)
+    return openings
+
+###########################################################
+# Function to check whether the moves of an opening are legal, played one after the other from the initial position
+def legal_opening(opening):
+    bitboard = BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0)
+    color = 'b'
+    for move in opening:
+        if not is_legal_move(bitboard, color, move):
+            return False
+        bitboard.make_move(move)
+        color = enemys_color(color)
+    return True
+
+###########################################################
+# Function to read the openings of a file in the format described at the top of this file
+# Raises ValueError if a line is not a sequence of legal moves from the initial position
+def read_openings(path):
+    openings = []
+    with open(path) as input_file:
+        for line_number, line in enumerate(input_file, 1):
+            if line.strip() == "":
+                continue
+            try:
+                opening = [[int(position) for position in move.split('-')] for move in line.split()]
+            except ValueError:
+                opening = None
+            if opening is None or not legal_opening(opening):
+                raise ValueError("%s line %d: %r is not an opening of legal moves" % (path, line_number, line.strip()))
+            openings.append(opening)
+    return openings
+
+###########################################################
+# Function to play one game, task being (game number, opening moves, whether engine A plays black, clock of each side
+# in seconds, largest number of plies)
+# Returns a dict with the game number, A's score (1 win, 0.5 draw, 0 loss), the winner ('b', 'w' or None), the reason
+# the game ended and all its moves (opening included)
+def play_selfplay_game(task):
+    number, opening, a_plays_black, game_time, max_plies = task
+    module_a, module_b = selfplay_engine_modules
+    modules = {'b': module_a if a_plays_black else module_b, 'w': module_b if a_plays_black else module_a}
+    engines = {'b': modules['b'].Engine(), 'w': modules['w'].Engine()}
+    clocks = {'b': game_time, 'w': game_time}
+
+    bitboard = BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0)
+    history = GameHistory(bitboard, 'b')
+    color = 'b'
+    moves_played = []
+    for move in opening:
+        history.play(bitboard, color, move)
+        moves_played.append(move)
+        color = enemys_color(color)
+
+    winner = None
+
+    while True:
+        legal_moves = legal_move_set(bitboard, color)
+        if len(legal_moves) == 0:
+            winner, reason = enemys_color(color), "no move left"
+            break
+        if history.repetitions(bitboard.key(color)) >= 3:
+            reason = "repetition"
+            break
+        if history.no_progress_plies >= NO_PROGRESS_PLIES:
+            reason = "no progress"
+            break
+        if len(moves_played) >= max_plies:
+            reason = "too long"
+            break
+
+        module = modules[color]
+        position = module.BitBoard(bitboard.black, bitboard.white, bitboard.kings)
+        time_budget = module.move_time_budget(position, color, clocks[color])
+        start_time = time.time()
+        if hasattr(module, "GameHistory"):  # engines older than the game history can still be played against
+            move = engines[color].search(position, color, time_budget, history)
+        else:
+            move = engines[color].search(position, color, time_budget)
+        clocks[color] -= time.time() - start_time
+
+        if clocks[color] < 0:
+            winner, reason = enemys_color(color), "time"
+            break
+        if not is_legal_move(bitboard, color, move, legal_moves):
+            winner, reason = enemys_color(color), "illegal move"
+            break
+
+        history.play(bitboard, color, move)
+        moves_played.append(move)
+        color = enemys_color(color)
+
+    if winner is None:
+        score = 0.5
+    else:
+        score = 1.0 if (winner == 'b') == a_plays_black else 0.0
+
+    return {"number": number, "score": score, "winner": winner, "reason": reason, "moves": moves_played}
+
+###########################################################
+# Function to return the expected score of a player rated elo points above its opponent
+def elo_to_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+###########################################################
+# Function to return the Elo difference giving an expected score
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+###########################################################
+# Function to return (Elo difference, lower bound, upper bound of its 95% confidence interval) for A, given A's wins,
+# draws and losses
+def elo_estimate(wins, draws, losses):
+    games = wins + draws + losses
+    score = (wins + 0.5 * draws) / games
+    variance = max((wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games,
+                   SCORE_VARIANCE_FLOOR)
+    margin = 1.96 * math.sqrt(variance / games)
+    return score_to_elo(score), score_to_elo(score - margin), score_to_elo(score + margin)
+
+###########################################################
+# Function to return the log-likelihood ratio of "A is elo1 better" against "A is elo0 better", given A's wins, draws
+# and losses (normal approximation of the game scores)
+def sprt_log_likelihood_ratio(wins, draws, losses, elo0, elo1):
+    games = wins + draws + losses
+    score = (wins + 0.5 * draws) / games
+    variance = max((wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games,
+                   SCORE_VARIANCE_FLOOR)
+    score0 = elo_to_score(elo0)
+    score1 = elo_to_score(elo1)
+    return games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+###########################################################
+# Function to play the match and write its progress to report_stream, returning A's (wins, draws, losses)
+# Every opening is played twice, A having black in the first game and white in the second, up to games games. With
+# sprt = (elo0, elo1), the match stops when the log-likelihood ratio leaves the bounds of the test.
+def run_match(engine_a_path, engine_b_path, openings, games, game_time, workers=1, max_plies=DEFAULT_MAX_PLIES,
+              sprt=None, games_stream=None, report_stream=sys.stdout, weights_a_path=None, weights_b_path=None,
+              records_writer=None):
+    tasks = []
+    for number in range(games):
+        opening = openings[(number // 2) % len(openings)]
+        tasks.append((number, opening, number % 2 == 0, game_time, max_plies))
+
+    lower_bound = math.log(SPRT_BETA / (1 - SPRT_ALPHA))
+    upper_bound = math.log((1 - SPRT_BETA) / SPRT_ALPHA)
+    results = {1.0: 0, 0.5: 0, 0.0: 0}
+
+    pool = multiprocessing.Pool(workers, init_selfplay_worker,
+                                (engine_a_path, engine_b_path, weights_a_path, weights_b_path))
+    try:
+        for game in pool.imap_unordered(play_selfplay_game, tasks):
+            results[game["score"]] += 1
+            wins, draws, losses = results[1.0], results[0.5], results[0.0]
+
+            if records_writer is not None:
+                records_writer.add_game(game["moves"], {'b': 1, 'w': -1, None: 0}[game["winner"]])
+            if games_stream is not None:
+                result = {'b': "1-0", 'w': "0-1", None: "1/2-1/2"}[game["winner"]]
+                games_stream.write(" ".join([result] + ["-".join(str(position) for position in move)
+                                                        for move in game["moves"]]) + "\n")
+                games_stream.flush()
+
+            elo, elo_low, elo_high = elo_estimate(wins, draws, losses)
+            report = "game %d (%s): +%d =%d -%d, Elo %.1f [%.1f, %.1f]" % (
+                game["number"] + 1, game["reason"], wins, draws, losses, elo, elo_low, elo_high)
+
+            if sprt is not None:
+                ratio = sprt_log_likelihood_ratio(wins, draws, losses, sprt[0], sprt[1])
+                report += ", LLR %.2f [%.2f, %.2f]" % (ratio, lower_bound, upper_bound)
+                if ratio >= upper_bound or ratio <= lower_bound:
+                    report_stream.write(report + "\n")
+                    report_stream.write("SPRT: %s\n" % ("H1 accepted, A is stronger" if ratio >= upper_bound
+                                                        else "H0 accepted, A is not stronger"))
+                    break
+
+            report_stream.write(report + "\n")
+            report_stream.flush()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    return results[1.0], results[0.5], results[0.0]
+
+###########################################################
+if __name__ == "__main__":
+    default_engine = os.path.join(os.path.dirname(os.path.abspath(__file__)), "homework.py")
+    parser = argparse.ArgumentParser(description="Play engine A against engine B and report the Elo difference")
+    parser.add_argument("--engine-a", default=default_engine, help="homework.py of engine A (default: this one)")
+    parser.add_argument("--engine-b", default=default_engine, help="homework.py of engine B (default: this one)")
+    parser.add_argument("--weights-a", metavar="FILE", help="evaluation weights of engine A (default: its own)")
+    parser.add_argument("--weights-b", metavar="FILE", help="evaluation weights of engine B (default: its own)")
+    parser.add_argument("--openings", metavar="FILE", help="openings to play (default: all two-ply openings)")
+    parser.add_argument("--games", type=int, default=2 * 49, help="number of games to play (default: 98)")
+    parser.add_argument("--time", type=float, default=DEFAULT_GAME_TIME,
+                        help="clock of each side for a game in seconds (default: %.0f)" % DEFAULT_GAME_TIME)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="number of games played at the same time (default: number of CPUs)")
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES,
+                        help="games are drawn after this many plies (default: %d)" % DEFAULT_MAX_PLIES)
+    parser.add_argument("--sprt", type=float, nargs=2, metavar=("ELO0", "ELO1"),
+                        help="stop once A is shown to be at most ELO0 or at least ELO1 Elo stronger than B")
+    parser.add_argument("--games-output", metavar="FILE", help="write the games played to this file")
+    parser.add_argument("--records", metavar="FILE", help="append the games played to this game records file")
+    arguments = parser.parse_args()
+
+    openings = read_openings(arguments.openings) if arguments.openings else default_openings()
+    games_stream = open(arguments.games_output, "w") if arguments.games_output else None
+    records_writer = GameRecordsWriter(arguments.records) if arguments.records else None
+    run_match(arguments.engine_a, arguments.engine_b, openings, arguments.games, arguments.time, arguments.workers,
+              arguments.max_plies, arguments.sprt, games_stream, weights_a_path=arguments.weights_a,
+              weights_b_path=arguments.weights_b, records_writer=records_writer)
+    if games_stream is not None:
+        games_stream.close()
+    if records_writer is not None:
+        records_writer.close()
+########################################################################################################################
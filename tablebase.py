@@ -0,0 +1,331 @@
+########################################################################################################################
+# Endgame tablebase
+# Generates, by retrograde analysis, the exact value of every position with at most a given number of pieces, and
+# reads it back from the generated file through mmap so that the search can look endgame positions up instead of
+# searching them (and several engine processes share a single copy of the tables in memory).
+#
+# Usage: python tablebase.py [--pieces N] [--output FILE]
+import argparse
+import collections
+import itertools
+import mmap
+import struct
+import sys
+import time
+
+from homework import BitBoard, NEIGHBOR_BITS, KING_DIRECTION_INDEXES, BLACK_MAN_DIRECTION_INDEXES, \
+    WHITE_MAN_DIRECTION_INDEXES, BLACK_KING_ROW_MASK, WHITE_KING_ROW_MASK, FULL_MASK, TABLEBASE_MAX_PLIES, bit_count
+
+###########################################################
+# File format
+# A header (magic, version, largest number of pieces, number of tables) followed by one directory entry per material
+# signature (black men, black kings, white men, white kings, offset of the table in the file, number of positions) and
+# the tables themselves. A table holds one byte per position with black to move followed by one byte per position
+# with white to move. A byte is 0 for a draw (or a position which can't happen, like a man on its own king row),
+# otherwise it is the number of plies until the side to move has no move left plus 1: an odd number of plies is a win
+# for the side to move and an even number a loss. The winner takes the quickest win and the loser the slowest loss.
+# Distances go up to TABLEBASE_MAX_PLIES, defined in homework.py as the search scores depend on it.
+TABLEBASE_MAGIC = b"CKTB"
+TABLEBASE_VERSION = 1
+TABLEBASE_HEADER = struct.Struct("<4sHHI")
+TABLEBASE_DIRECTORY_ENTRY = struct.Struct("<BBBBQI")
+DEFAULT_TABLEBASE_PIECES = 4
+DEFAULT_TABLEBASE_FILE = "endgame.tb"
+
+# BINOMIAL[n][k] is the number of ways to choose k squares among n
+BINOMIAL = [[0] * 33 for n in range(33)]
+for n in range(33):
+    BINOMIAL[n][0] = 1
+    for k in range(1, n + 1):
+        BINOMIAL[n][k] = BINOMIAL[n - 1][k - 1] + BINOMIAL[n - 1][k]
+
+###########################################################
+# Function to return the material signature (black men, black kings, white men, white kings) of a position
+def material_signature(black, white, kings):
+    return bit_count(black & ~kings), bit_count(black & kings), bit_count(white & ~kings), bit_count(white & kings)
+
+###########################################################
+# Function to return the number of positions of a material signature
+# The pieces are placed group after group (black men, black kings, white men, white kings), every group on the
+# squares left empty by the previous ones
+def signature_size(signature):
+    size = 1
+    free = 32
+    for count in signature:
+        size *= BINOMIAL[free][count]
+        free -= count
+    return size
+
+###########################################################
+# Function to return the index of a position in the table of its material signature
+# Every group is ranked as a combination of the squares left empty by the previous groups (the k-th lowest square c
+# of the group adds BINOMIAL[c][k]), and the ranks are combined as the digits of a mixed-radix number
+def position_index(black, white, kings):
+    index = 0
+    occupied = 0
+    free = 32
+
+    for group in (black & ~kings, black & kings, white & ~kings, white & kings):
+        rank = 0
+        count = 0
+        remaining = group
+        while remaining:
+            square_bit = remaining & -remaining
+            remaining ^= square_bit
+            count += 1
+            rank += BINOMIAL[square_bit.bit_length() - 1 - bit_count(occupied & (square_bit - 1))][count]
+
+        index = index * BINOMIAL[free][count] + rank
+        occupied |= group
+        free -= count
+
+    return index
+
+###########################################################
+# Function to return the board of the position given by its three bitboards
+# The search hash and score of the board are not needed here and are left at 0, make_move and unmake_move only add
+# differences to them
+def masks_bitboard(black, white, kings):
+    bitboard = BitBoard.__new__(BitBoard)
+    bitboard.black = black
+    bitboard.white = white
+    bitboard.kings = kings
+    bitboard.hash = 0
+    bitboard.score = 0
+    return bitboard
+
+###########################################################
+# Function to return every (black, white, kings) position of a material signature, at the index of its table
+def signature_positions(signature):
+    positions = [None] * signature_size(signature)
+
+    def place(groups, occupied, black, white, kings):
+        if len(groups) == 0:
+            positions[position_index(black, white, kings)] = (black, white, kings)
+            return
+
+        group_index = 4 - len(groups)
+        free_squares = [1 << i for i in range(32) if not occupied & (1 << i)]
+        for combination in itertools.combinations(free_squares, groups[0]):
+            mask = 0
+            for square_bit in combination:
+                mask |= square_bit
+
+            if group_index < 2:
+                place(groups[1:], occupied | mask, black | mask, white, kings | (mask if group_index == 1 else 0))
+            else:
+                place(groups[1:], occupied | mask, black, white | mask, kings | (mask if group_index == 3 else 0))
+
+    place(list(signature), 0, 0, 0, 0)
+    return positions
+
+###########################################################
+# Function to return all the material signatures with 1 to max_pieces pieces on each side in total, in the order in
+# which they can be solved: a capture leads to fewer pieces and a promotion to fewer men, so every move out of a
+# signature leads to one which comes earlier
+def tablebase_signatures(max_pieces):
+    signatures = []
+    for black_men in range(max_pieces + 1):
+        for black_kings in range(max_pieces + 1):
+            for white_men in range(max_pieces + 1):
+                for white_kings in range(max_pieces + 1):
+                    signature = (black_men, black_kings, white_men, white_kings)
+                    if black_men + black_kings >= 1 and white_men + white_kings >= 1 and sum(signature) <= max_pieces:
+                        signatures.append(signature)
+
+    signatures.sort(key=lambda signature: (sum(signature), signature[0] + signature[2]))
+    return signatures
+
+###########################################################
+# Function to return whether a position can happen in a game (no man stands on the row where it would be crowned)
+def valid_position(black, white, kings):
+    return not (black & ~kings & BLACK_KING_ROW_MASK or white & ~kings & WHITE_KING_ROW_MASK)
+
+###########################################################
+# Function to return the (black, white, kings) positions from which the side that just moved (mover, 'b' or 'w') got
+# to this one with a simple move, every such move giving one predecessor
+# A man moves back away from its king row and a king anywhere. The predecessor must not have had a capture available,
+# as capturing is mandatory.
+def predecessors(black, white, kings, mover):
+    if mover == 'b':
+        us, man_directions = black, WHITE_MAN_DIRECTION_INDEXES  # black men came down, so they go back up
+    else:
+        us, man_directions = white, BLACK_MAN_DIRECTION_INDEXES
+
+    empty = ~(black | white) & FULL_MASK
+    result = []
+
+    pieces = us
+    while pieces:
+        square_bit = pieces & -pieces
+        pieces ^= square_bit
+        neighbors = NEIGHBOR_BITS[square_bit.bit_length()]
+        is_king = square_bit & kings
+
+        for direction in (KING_DIRECTION_INDEXES if is_king else man_directions):
+            origin = neighbors[direction] & empty
+            if origin:
+                moving = square_bit | origin
+                if mover == 'b':
+                    previous = (black ^ moving, white, kings ^ moving if is_king else kings)
+                else:
+                    previous = (black, white ^ moving, kings ^ moving if is_king else kings)
+
+                if not masks_bitboard(*previous).jumpers(mover):
+                    result.append(previous)
+
+    return result
+
+###########################################################
+# Function to solve the tables of a material signature, given the tables of all the signatures its moves can lead to
+# (solved_tables maps a signature to its two bytearrays, black to move and white to move)
+# Retrograde analysis: positions are decided by increasing number of plies to the end of the game. Moves leading out
+# of the signature (captures and promotions) are looked up in solved_tables once at the start. Then every position
+# decided at distance d decides its predecessors in the signature: a loss at d makes them wins at d + 1, a win at d
+# brings them one child closer to being a loss, which happens when all their children are wins (the longest one
+# giving the distance). Positions left undecided are draws.
+def solve_signature(signature, solved_tables):
+    positions = signature_positions(signature)
+    tables = (bytearray(len(positions)), bytearray(len(positions)))
+    children_left = ([0] * len(positions), [0] * len(positions))
+    longest_win = ([0] * len(positions), [0] * len(positions))
+    pending = collections.defaultdict(list)  # distance -> list of (side, index) to be decided at that distance
+
+    for side, color in enumerate("bw"):
+        for index, position in enumerate(positions):
+            if position is None or not valid_position(*position):
+                continue
+
+            bitboard = masks_bitboard(*position)
+            moves = bitboard.moves(color)
+            if len(moves) == 0:
+                pending[0].append((side, index))
+                continue
+
+            left = 0
+            win_at = None
+            for move in moves:
+                undo = bitboard.make_move(move)
+                if undo[2] or undo[4]:  # capture or promotion, the result is in another table
+                    value = probe_tables(solved_tables, bitboard.black, bitboard.white, bitboard.kings, 1 - side)
+                    if value is None:  # the last enemy piece was captured
+                        win_at = 1
+                    elif value == 0 or value % 2 == 1:  # draw or loss for the enemy
+                        left += 1
+                        if value != 0 and (win_at is None or value < win_at):
+                            win_at = value
+                    else:
+                        longest_win[side][index] = max(longest_win[side][index], value - 1)
+                else:
+                    left += 1
+                bitboard.unmake_move(undo)
+
+            children_left[side][index] = left
+            if win_at is not None:
+                pending[win_at].append((side, index))
+            elif left == 0:
+                pending[longest_win[side][index] + 1].append((side, index))
+
+    distance = 0
+    while pending:
+        for side, index in pending.pop(distance, []):
+            if tables[side][index]:
+                continue
+            if distance > TABLEBASE_MAX_PLIES:
+                raise ValueError("distance to the end of the game does not fit in a byte for %s" % (signature,))
+            tables[side][index] = distance + 1
+
+            previous_side = 1 - side
+            for previous in predecessors(*positions[index], mover="bw"[previous_side]):
+                previous_index = position_index(*previous)
+                if tables[previous_side][previous_index]:
+                    continue
+                if distance % 2 == 0:
+                    pending[distance + 1].append((previous_side, previous_index))
+                else:
+                    children_left[previous_side][previous_index] -= 1
+                    if children_left[previous_side][previous_index] == 0:
+                        longest = max(distance, longest_win[previous_side][previous_index])
+                        pending[longest + 1].append((previous_side, previous_index))
+        distance += 1
+
+    return tables
+
+###########################################################
+# Function to return the byte stored for a position with side (0 black, 1 white) to move, or None if a side has no
+# piece left; tables maps a signature to a pair (black to move, white to move) of byte sequences
+def probe_tables(tables, black, white, kings, side):
+    if not black or not white:
+        return None
+    return tables[material_signature(black, white, kings)][side][position_index(black, white, kings)]
+
+###########################################################
+# Function to generate the tables of all positions with up to max_pieces pieces and write them to path
+def generate_tablebase(max_pieces, path, log=sys.stderr):
+    solved_tables = {}
+    signatures = tablebase_signatures(max_pieces)
+
+    for signature in signatures:
+        start = time.time()
+        solved_tables[signature] = solve_signature(signature, solved_tables)
+        log.write("%s: %d positions in %.1fs\n" % (signature, len(solved_tables[signature][0]), time.time() - start))
+
+    with open(path, "wb") as output:
+        output.write(TABLEBASE_HEADER.pack(TABLEBASE_MAGIC, TABLEBASE_VERSION, max_pieces, len(signatures)))
+        offset = TABLEBASE_HEADER.size + TABLEBASE_DIRECTORY_ENTRY.size * len(signatures)
+        for signature in signatures:
+            size = len(solved_tables[signature][0])
+            output.write(TABLEBASE_DIRECTORY_ENTRY.pack(*(signature + (offset, size))))
+            offset += 2 * size
+        for signature in signatures:
+            output.write(solved_tables[signature][0])
+            output.write(solved_tables[signature][1])
+
+###########################################################
+# Class reading a tablebase file generated by generate_tablebase() through mmap
+# probe() returns (outcome, plies) for the side to move: outcome is 1 for a win, -1 for a loss and 0 for a draw, and
+# plies is the number of plies until the loser has no move left (0 for a draw)
+class EndgameTablebase:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as input_file:
+            self.data = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.max_pieces, count = TABLEBASE_HEADER.unpack_from(self.data, 0)
+        if magic != TABLEBASE_MAGIC or version != TABLEBASE_VERSION:
+            raise ValueError("%s is not a tablebase file" % path)
+
+        self.tables = {}
+        for i in range(count):
+            entry = TABLEBASE_DIRECTORY_ENTRY.unpack_from(self.data, TABLEBASE_HEADER.size +
+                                                          i * TABLEBASE_DIRECTORY_ENTRY.size)
+            self.tables[entry[:4]] = entry[4:]
+
+    def close(self):
+        self.data.close()
+
+    ###########################################################
+    # Function to return the value of the position for color ('b' or 'w'), or None if it is not in the tables
+    def probe(self, bitboard, color):
+        black, white, kings = bitboard.black, bitboard.white, bitboard.kings
+        table = self.tables.get(material_signature(black, white, kings))
+        if table is None:
+            return None
+
+        offset, size = table
+        value = self.data[offset + (size if color == 'w' else 0) + position_index(black, white, kings)]
+        if value == 0:
+            return 0, 0
+        return (1 if value % 2 == 0 else -1), value - 1
+
+###########################################################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the endgame tablebase used by homework.py --tablebase")
+    parser.add_argument("--pieces", type=int, default=DEFAULT_TABLEBASE_PIECES,
+                        help="largest number of pieces on the board (default: %d)" % DEFAULT_TABLEBASE_PIECES)
+    parser.add_argument("--output", default=DEFAULT_TABLEBASE_FILE,
+                        help="file to write (default: %s)" % DEFAULT_TABLEBASE_FILE)
+    arguments = parser.parse_args()
+
+    generate_tablebase(arguments.pieces, arguments.output)
+########################################################################################################################
@@ -0,0 +1,106 @@
+########################################################################################################################
+# Tests of game_records.py
+# Run with: python -m pytest (or python -m unittest)
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from game_records import GameRecords, GameRecordsWriter, RECORD, RECORDS_HEADER
+from homework import BitBoard, INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, enemys_color
+
+RANDOM_SEED = 561
+GAMES = 20
+MAX_PLIES = 120
+
+###########################################################
+# Function to return random games from the initial position as (moves, result) pairs
+def random_games(rng, count):
+    games = []
+    for n in range(count):
+        bitboard = BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0)
+        color = 'b'
+        moves = []
+        for ply in range(rng.randint(1, MAX_PLIES)):
+            legal_moves = bitboard.moves(color)
+            if len(legal_moves) == 0:
+                break
+            moves.append(rng.choice(legal_moves))
+            bitboard.make_move(moves[-1])
+            color = enemys_color(color)
+        games.append((moves, rng.choice([1, 0, -1])))
+    return games
+
+###########################################################
+class GameRecordsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "games.bin")
+        self.games = random_games(random.Random(RANDOM_SEED), GAMES)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_games(self, games):
+        with GameRecordsWriter(self.path) as writer:
+            for moves, result in games:
+                writer.add_game(moves, result)
+
+    def read_games(self):
+        records = GameRecords(self.path)
+        try:
+            return list(records.games())
+        finally:
+            records.close()
+
+    def test_round_trip(self):
+        self.write_games(self.games[:GAMES // 2])
+        self.write_games(self.games[GAMES // 2:])
+        self.assertEqual(self.read_games(), self.games)
+
+    def test_random_access(self):
+        self.write_games(self.games)
+        records = GameRecords(self.path)
+        self.assertEqual(len(records), sum(len(moves) for moves, result in self.games))
+
+        index = 0
+        for moves, result in self.games:
+            bitboard = BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0)
+            color = 'b'
+            for move in moves:
+                record_bitboard, record_color, record_move, record_result = records.position(index)
+                self.assertEqual((record_bitboard.black, record_bitboard.white, record_bitboard.kings),
+                                 (bitboard.black, bitboard.white, bitboard.kings))
+                self.assertEqual((record_color, record_move, record_result), (color, move, result))
+                bitboard.make_move(move)
+                color = enemys_color(color)
+                index += 1
+        records.close()
+
+    def test_append_after_incomplete_record(self):
+        self.write_games(self.games[:4])
+        os.truncate(self.path, os.path.getsize(self.path) - 7)
+        self.write_games(self.games[4:])
+
+        games = self.read_games()
+        self.assertEqual(len(games), GAMES)
+        self.assertEqual(games[:3] + games[4:], self.games[:3] + self.games[4:])
+        self.assertEqual(games[3], (self.games[3][0][:-1], self.games[3][1]))
+
+    def test_illegal_move(self):
+        self.write_games(self.games[:2])
+        with self.assertRaises(ValueError):
+            self.write_games([([[11, 15], [23, 19], [15, 11]], 0)])
+        self.assertEqual(self.read_games(), self.games[:2])
+
+    def test_corrupted_move(self):
+        self.write_games(self.games)
+        with open(self.path, "r+b") as records_file:
+            records_file.seek(RECORDS_HEADER.size + RECORD.size + 12)  # the from and to squares of the second ply
+            records_file.write(b"\xff\x03")
+
+        with self.assertRaises(ValueError):
+            self.read_games()
+
+########################################################################################################################
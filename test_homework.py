@@ -0,0 +1,358 @@
+########################################################################################################################
+# Tests of homework.py
+# Run with: python -m pytest (or python -m unittest)
+import io
+import random
+import shutil
+import tempfile
+import unittest
+
+from homework import BitBoard, Engine, GameHistory, INFINITE_SCORE, INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, \
+    NO_PROGRESS_PLIES, PARALLEL_MIN_DEPTH, WIN_SCORE, ParallelEngine, SERIAL_TO_GRID_POSITION, defensive_move, \
+    enemys_color, decode_move, encode_move, grid_position_to_serial_position, legal_move_set, material_score, \
+    play_from_input, replay_game_history, run_server, score_from_table, score_to_table, TABLEBASE_MAX_PLIES, \
+    write_move, zobrist_hash
+
+# number of positions reached from the initial position after 1, 2, ... plies (perft of English draughts)
+INITIAL_PERFT = [7, 49, 302, 1469, 7361, 36768]
+RANDOM_POSITIONS = 300
+RANDOM_SEED = 561
+SEARCH_POSITIONS = 40
+SEARCH_DEPTH = 4
+PARALLEL_POSITIONS = 40
+PARALLEL_DEPTH = PARALLEL_MIN_DEPTH + 2
+
+###########################################################
+# Function to return a random board in the input.txt format, without men on the row where they would be kings
+def random_grid(rng):
+    board = [['.'] * 8 for x in range(8)]
+    for x, y in SERIAL_TO_GRID_POSITION[1:]:
+        r = rng.random()
+        if r < 0.25:
+            piece = 'b' if x != 7 else 'B'
+        elif r < 0.5:
+            piece = 'w' if x != 0 else 'W'
+        else:
+            continue
+        board[x][y] = piece.upper() if rng.random() < 0.2 else piece
+    return board
+
+###########################################################
+# Functions to return all the legal moves of color on a board in the input.txt format, straight from the rules of the
+# game on the grid: black men move down (x + 1), white men up, kings both ways, a capture must be taken if there is
+# one, a jump goes on as long as the piece can capture again, and a man reaching the last row is crowned, which ends
+# the move
+def reference_jumps(board, x, y, color, is_king, path):
+    directions = [-1, 1] if is_king else [1] if color == 'b' else [-1]
+    jumps = []
+    for i in directions:
+        for j in [-1, 1]:
+            x1, y1, x2, y2 = x + i, y + j, x + 2 * i, y + 2 * j
+            if not (0 <= x2 <= 7 and 0 <= y2 <= 7) or board[x2][y2] != '.' or \
+                    board[x1][y1].lower() != enemys_color(color):
+                continue
+            jumped = board[x1][y1]
+            board[x1][y1] = '.'
+            next_path = path + [grid_position_to_serial_position(x2, y2)]
+            crowned = not is_king and x2 == (7 if color == 'b' else 0)
+            further = [] if crowned else reference_jumps(board, x2, y2, color, is_king, next_path)
+            jumps.extend(further if further else [next_path])
+            board[x1][y1] = jumped
+    return jumps
+
+def reference_moves(board, color):
+    pieces = [(x, y) for x, y in SERIAL_TO_GRID_POSITION[1:] if board[x][y].lower() == color]
+    jumps = []
+    for x, y in pieces:
+        piece = board[x][y]
+        board[x][y] = '.'
+        jumps.extend(reference_jumps(board, x, y, color, piece.isupper(), [grid_position_to_serial_position(x, y)]))
+        board[x][y] = piece
+    if jumps:
+        return jumps
+
+    moves = []
+    for x, y in pieces:
+        directions = [-1, 1] if board[x][y].isupper() else [1] if color == 'b' else [-1]
+        for i in directions:
+            for j in [-1, 1]:
+                if 0 <= x + i <= 7 and 0 <= y + j <= 7 and board[x + i][y + j] == '.':
+                    moves.append([grid_position_to_serial_position(x, y),
+                                  grid_position_to_serial_position(x + i, y + j)])
+    return moves
+
+###########################################################
+# Function to perform a move returned by reference_moves() on a copy of the board, which is returned
+def reference_play(board, move):
+    board = [line[:] for line in board]
+    x, y = SERIAL_TO_GRID_POSITION[move[0]]
+    piece = board[x][y]
+    board[x][y] = '.'
+    for i in range(1, len(move)):
+        x1, y1 = SERIAL_TO_GRID_POSITION[move[i - 1]]
+        x2, y2 = SERIAL_TO_GRID_POSITION[move[i]]
+        if abs(x2 - x1) == 2:
+            board[(x1 + x2) // 2][(y1 + y2) // 2] = '.'
+    x, y = SERIAL_TO_GRID_POSITION[move[-1]]
+    if x == (7 if piece == 'b' else 0 if piece == 'w' else -1):
+        piece = piece.upper()
+    board[x][y] = piece
+    return board
+
+###########################################################
+# Function to return the number of positions reached from bitboard after depth plies, color to move
+def perft(bitboard, color, depth):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in bitboard.moves(color):
+        undo = bitboard.make_move(move)
+        nodes += perft(bitboard, enemys_color(color), depth - 1)
+        bitboard.unmake_move(undo)
+    return nodes
+
+###########################################################
+# Function to return the exact value of every move of color in bitboard searched to depth, each with the full window
+# by a new Engine
+def exact_root_values(bitboard, color, depth):
+    values = {}
+    for move in bitboard.moves(color):
+        engine = Engine()
+        engine.new_search()
+        engine.path_keys = [bitboard.key(color)]
+        engine.reversible_start = 0
+        child = bitboard.copy()
+        engine.enter_position(child, enemys_color(color), child.make_move(move))
+        values[tuple(move)] = -engine.evaluation(child, enemys_color(color), depth, -INFINITE_SCORE, INFINITE_SCORE,
+                                                 1, [])
+    return values
+
+###########################################################
+# Function to return random boards where color has several moves
+def random_search_positions(rng, color, count):
+    positions = []
+    while len(positions) < count:
+        bitboard = BitBoard.from_grid(random_grid(rng))
+        if len(bitboard.moves(color)) > 1:
+            positions.append(bitboard)
+    return positions
+
+###########################################################
+class MoveGenerationTest(unittest.TestCase):
+    def test_initial_perft(self):
+        bitboard = BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0)
+        for depth, nodes in enumerate(INITIAL_PERFT, 1):
+            self.assertEqual(perft(bitboard, 'b', depth), nodes)
+
+    def test_grid_round_trip(self):
+        rng = random.Random(RANDOM_SEED)
+        for n in range(RANDOM_POSITIONS):
+            board = random_grid(rng)
+            self.assertEqual(BitBoard.from_grid(board).to_grid(), board)
+
+    def test_moves_match_the_rules(self):
+        rng = random.Random(RANDOM_SEED)
+        for n in range(RANDOM_POSITIONS):
+            board = random_grid(rng)
+            bitboard = BitBoard.from_grid(board)
+            for color in 'bw':
+                self.assertEqual(sorted(bitboard.moves(color)), sorted(reference_moves(board, color)), board)
+                jumps = [move for move in reference_moves(board, color)
+                         if abs(SERIAL_TO_GRID_POSITION[move[0]][0] - SERIAL_TO_GRID_POSITION[move[1]][0]) == 2]
+                self.assertEqual(sorted(bitboard.captures(color)), sorted(jumps), board)
+                if len(jumps) == 0:
+                    movers = sum(set(1 << (move[0] - 1) for move in reference_moves(board, color)))
+                    self.assertEqual(bitboard.movers(color), movers, board)
+
+    def test_make_and_unmake_move(self):
+        rng = random.Random(RANDOM_SEED)
+        for n in range(RANDOM_POSITIONS):
+            board = random_grid(rng)
+            bitboard = BitBoard.from_grid(board)
+            before = (bitboard.black, bitboard.white, bitboard.kings, bitboard.hash, bitboard.score)
+            for color in 'bw':
+                for move in bitboard.moves(color):
+                    undo = bitboard.make_move(move)
+                    self.assertEqual(bitboard.to_grid(), reference_play(board, move), (board, move))
+                    self.assertEqual(bitboard.hash, zobrist_hash(bitboard.black, bitboard.white, bitboard.kings))
+                    self.assertEqual(bitboard.score, material_score(bitboard.black, bitboard.white, bitboard.kings))
+                    bitboard.unmake_move(undo)
+                    self.assertEqual((bitboard.black, bitboard.white, bitboard.kings, bitboard.hash, bitboard.score),
+                                     before, (board, move))
+
+###########################################################
+class SearchTest(unittest.TestCase):
+    # the move played has the value reported, which is the best one, and a defensive move is played if one is best
+    def test_move_played_is_best(self):
+        rng = random.Random(RANDOM_SEED)
+        for bitboard in random_search_positions(rng, 'b', SEARCH_POSITIONS):
+            result = Engine().analyse(bitboard, 'b', max_depth=SEARCH_DEPTH)
+            values = exact_root_values(bitboard, 'b', SEARCH_DEPTH)
+            best = max(values.values())
+            self.assertEqual(result.score, best, bitboard.to_grid())
+            self.assertEqual(values[tuple(result.move)], best, bitboard.to_grid())
+            if any(defensive_move(bitboard.black, move) for move in values if values[move] == best):
+                self.assertTrue(defensive_move(bitboard.black, result.move), bitboard.to_grid())
+
+    # a leaf whose side to move has no piece, or only blocked ones, is a loss, as it would be one ply deeper
+    def test_no_move_at_leaf(self):
+        no_piece = BitBoard((1 << 22) | 1, 0, 0)
+        blocked = BitBoard.from_grid(PlayFromInputTest.NO_MOVE_BOARD)
+        for bitboard, color in ((no_piece, 'w'), (blocked, 'b')):
+            for depth in (1, 2):
+                engine = Engine()
+                engine.new_search()
+                engine.path_keys = [bitboard.key(color)]
+                engine.reversible_start = 0
+                self.assertEqual(engine.evaluation(bitboard, color, depth, -INFINITE_SCORE, INFINITE_SCORE, 1, []),
+                                 1 - WIN_SCORE, (bitboard.to_grid(), depth))
+
+    # won and lost scores, tablebase ones included, are stored as the distance from the position to the end of the
+    # game and read back as the distance from the root
+    def test_table_scores(self):
+        for plies in (0, 1, TABLEBASE_MAX_PLIES):
+            for sign in (1, -1):
+                score = sign * (WIN_SCORE - 3 - plies)
+                self.assertEqual(score_to_table(score, 3), sign * (WIN_SCORE - plies))
+                self.assertEqual(score_from_table(score_to_table(score, 3), 5), sign * (WIN_SCORE - 5 - plies))
+        self.assertEqual(score_from_table(score_to_table(1234, 3), 5), 1234)
+
+    # the parallel search plays the same move with the same value as the serial one
+    def test_parallel_search_matches_serial(self):
+        rng = random.Random(RANDOM_SEED)
+        with ParallelEngine(2) as parallel_engine:
+            for bitboard in random_search_positions(rng, 'w', PARALLEL_POSITIONS):
+                parallel_engine.new_game()
+                serial_result = Engine().analyse(bitboard, 'w', max_depth=PARALLEL_DEPTH)
+                parallel_result = parallel_engine.analyse(bitboard, 'w', max_depth=PARALLEL_DEPTH)
+                self.assertEqual((parallel_result.move, parallel_result.score),
+                                 (serial_result.move, serial_result.score), bitboard.to_grid())
+
+###########################################################
+# Function to return a board of kings on the given serial positions
+def kings_board(black_positions, white_positions):
+    black = sum(1 << (position - 1) for position in black_positions)
+    white = sum(1 << (position - 1) for position in white_positions)
+    return BitBoard(black, white, black | white)
+
+###########################################################
+class GameHistoryTest(unittest.TestCase):
+    SHUFFLE = [([1, 5], 'b'), ([29, 25], 'w'), ([5, 1], 'b'), ([25, 29], 'w')]
+
+    # Function to return the history of the game which went cycles times through the shuffle moves to reach bitboard
+    def shuffled_history(self, bitboard, cycles):
+        history = GameHistory(bitboard, 'b')
+        board = bitboard.copy()
+        for n in range(cycles):
+            for move, color in self.SHUFFLE:
+                history.play(board, color, move)
+        return history
+
+    # black, a king down, draws by going back to a position of the game
+    def test_repetition_is_a_draw(self):
+        bitboard = kings_board([1], [29, 32])
+        self.assertLess(Engine().analyse(bitboard, 'b', max_depth=SEARCH_DEPTH).score, 0)
+        history = self.shuffled_history(bitboard, 1)
+        self.assertEqual(Engine().analyse(bitboard, 'b', max_depth=SEARCH_DEPTH, history=history).score, 0)
+
+    # black, a king up, can't win any more after NO_PROGRESS_PLIES plies without a capture or a man move
+    def test_no_progress_is_a_draw(self):
+        bitboard = kings_board([1, 3], [29])
+        self.assertGreater(Engine().analyse(bitboard, 'b', max_depth=SEARCH_DEPTH).score, 0)
+        history = self.shuffled_history(bitboard, NO_PROGRESS_PLIES // len(self.SHUFFLE))
+        self.assertEqual(history.no_progress_plies, NO_PROGRESS_PLIES)
+        self.assertEqual(Engine().analyse(bitboard, 'b', max_depth=SEARCH_DEPTH, history=history).score, 0)
+
+    # the last move of the enemy, left out of the moves, is found from the board
+    def test_missing_last_move(self):
+        bitboard = BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0)
+        game = [[11, 15], [23, 19], [8, 11]]
+        for move in game:
+            bitboard.make_move(move)
+
+        moves = game[:2]
+        history = replay_game_history(moves, bitboard, 'w')
+        self.assertEqual(moves, game)
+        self.assertEqual(history.keys[-1], bitboard.key('w'))
+        self.assertEqual(history.no_progress_plies, 0)
+        self.assertIsNone(replay_game_history(game[:1], bitboard, 'w'))
+
+###########################################################
+class MoveNotationTest(unittest.TestCase):
+    def test_examples(self):
+        self.assertEqual(encode_move([9, 14]), "E b6 c5")
+        self.assertEqual(encode_move([22, 15, 6]), "J c3 e5 \nJ e5 c7 \n")
+        self.assertEqual(decode_move("E b6 c5"), [9, 14])
+        self.assertEqual(decode_move("J c3 e5\nJ e5 c7\n"), [22, 15, 6])
+
+    def test_round_trip(self):
+        rng = random.Random(RANDOM_SEED)
+        for n in range(RANDOM_POSITIONS):
+            bitboard = BitBoard.from_grid(random_grid(rng))
+            for color in 'bw':
+                for move in bitboard.moves(color):
+                    output = io.StringIO()
+                    write_move(output, move)
+                    self.assertEqual(output.getvalue(), encode_move(move))
+                    self.assertEqual(decode_move(output.getvalue()), move)
+
+    def test_invalid_moves(self):
+        # unknown square, unknown prefix, a single move of two rows, a jump over no square, a single move followed by
+        # another line, jumps which don't follow each other, no move at all
+        for text in ("E b6 c9", "X b6 c5", "E b6 d4", "J b6 c5", "E b6 c5\nE c5 d4", "J c3 e5\nJ c5 e7", "", "\n"):
+            with self.assertRaises(ValueError):
+                decode_move(text)
+
+###########################################################
+class PlayFromInputTest(unittest.TestCase):
+    # black's only man is blocked by the two white men on the last row
+    NO_MOVE_BOARD = ["........", "........", "........", "........", "........", "........", ".b......", "w.w....."]
+
+    def test_no_move_left(self):
+        for game_type in ("SINGLE", "GAME"):
+            output = io.StringIO()
+            board_output = io.StringIO()
+            play_from_input([game_type, "BLACK", "100.0"] + self.NO_MOVE_BOARD, output, Engine(), board_output)
+            self.assertEqual(output.getvalue(), "")
+            if game_type == "GAME":
+                self.assertEqual(board_output.getvalue().split(), self.NO_MOVE_BOARD)
+
+    # a history which can't be read is ignored, the move is still played
+    def test_malformed_history(self):
+        board = BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0).to_grid()
+        for history_line in ("HISTORY 10-x", "HISTORY 11-15 -", "HISTORY"):
+            output = io.StringIO()
+            play_from_input(["GAME", "BLACK", "1.0"] + ["".join(row) for row in board] + [history_line], output,
+                            Engine(), io.StringIO())
+            self.assertIn(tuple(decode_move(output.getvalue())), legal_move_set(BitBoard.from_grid(board), 'b'))
+
+    # a history file which can't be read or written (here a directory) doesn't stop the move from being played
+    def test_history_file_error(self):
+        board = ["".join(row) for row in BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0).to_grid()]
+        directory = tempfile.mkdtemp()
+        try:
+            output = io.StringIO()
+            play_from_input(["GAME", "BLACK", "1.0"] + board + ["HISTORY_FILE " + directory], output, Engine(),
+                            io.StringIO())
+            self.assertIn(tuple(decode_move(output.getvalue())), legal_move_set(BitBoard.from_grid(board), 'b'))
+        finally:
+            shutil.rmtree(directory)
+
+###########################################################
+class ServerTest(unittest.TestCase):
+    # a malformed request is answered with an error and the server goes on with the next one
+    def test_malformed_request(self):
+        board = ["".join(row) for row in BitBoard(INITIAL_BLACK_MASK, INITIAL_WHITE_MASK, 0).to_grid()]
+        requests = ["GAME", "WHITE", ""] + board + ["go", "GAME", "WHITE", "go", "GAME", "BLACK", "1.0"] + board + \
+            ["go", "quit", "GAME"]
+        output = io.StringIO()
+        run_server(io.StringIO("\n".join(requests) + "\n"), output, Engine())
+
+        answers = output.getvalue().split("end\n")
+        self.assertEqual(len(answers), 4)
+        self.assertTrue(answers[0].startswith("error "))
+        self.assertTrue(answers[1].startswith("error "))
+        self.assertIn(tuple(decode_move(answers[2])), legal_move_set(BitBoard.from_grid(board), 'b'))
+        self.assertEqual(answers[3], "")
+
+########################################################################################################################
@@ -0,0 +1,59 @@
+########################################################################################################################
+# Tests of opening_book.py
+# Run with: python -m pytest (or python -m unittest)
+import os
+import shutil
+import tempfile
+import unittest
+
+from homework import enemys_color
+from opening_book import OpeningBook, OpeningBookBuilder, initial_position, read_games
+
+GAME = [[11, 15], [23, 19], [8, 11], [22, 17]]
+
+###########################################################
+class OpeningBookTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "test.book")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_game_moves_round_trip(self):
+        builder = OpeningBookBuilder()
+        builder.add_game(GAME, 0, len(GAME))
+        builder.write(self.path)
+
+        book = OpeningBook(self.path)
+        bitboard = initial_position()
+        color = 'b'
+        for move in GAME:
+            self.assertEqual(book.probe(bitboard, color), move)
+            bitboard.make_move(move)
+            color = enemys_color(color)
+        self.assertIsNone(book.probe(bitboard, color))
+        book.close()
+
+    def test_illegal_game(self):
+        builder = OpeningBookBuilder()
+        for moves in ([[11, 15], [23, 19], [15, 11]], [[11, 15], [11, 15]], [[11, 15], [24, 19], [8, 11]]):
+            with self.assertRaises(ValueError):
+                builder.add_game(moves, 0, len(moves))
+        self.assertEqual(builder.entries, {})
+
+    # a line which is not a game gives an error in place of its game, the games after it are still read
+    def test_malformed_game_lines(self):
+        games_path = os.path.join(self.directory, "games.txt")
+        with open(games_path, "w") as games_file:
+            games_file.write("1-0 11-15 23-19\n1-0 11-1x\n\n2-0 11-15\n0-1 11-15\n1/2-1/2\n")
+
+        games = list(read_games(games_path))
+        self.assertEqual(len(games), 5)
+        self.assertEqual(games[0], ([[11, 15], [23, 19]], 1))
+        for moves, error in games[1:3]:
+            self.assertIsNone(moves)
+            self.assertIsInstance(error, ValueError)
+        self.assertEqual(games[3:], [([[11, 15]], -1), ([], 0)])
+
+########################################################################################################################
@@ -0,0 +1,57 @@
+########################################################################################################################
+# Tests of selfplay.py
+# Run with: python -m pytest (or python -m unittest)
+import os
+import shutil
+import math
+import tempfile
+import unittest
+
+from selfplay import SPRT_ALPHA, SPRT_BETA, default_openings, elo_estimate, legal_opening, read_openings, \
+    sprt_log_likelihood_ratio
+
+###########################################################
+class OpeningsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "openings.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_openings(self, text):
+        with open(self.path, "w") as output:
+            output.write(text)
+
+    def test_default_openings_are_legal(self):
+        self.assertTrue(all(legal_opening(opening) for opening in default_openings()))
+
+    def test_read_openings(self):
+        self.write_openings("11-15 23-19 8-11\n\n9-14 22-17\n")
+        self.assertEqual(read_openings(self.path), [[[11, 15], [23, 19], [8, 11]], [[9, 14], [22, 17]]])
+
+    def test_illegal_openings(self):
+        # a move of the wrong side, a man moving backwards, a move to an occupied square, a mistyped move, a move
+        # which is not the capture the position requires
+        for line in ("23-19 11-15", "11-15 23-19 15-11", "8-12", "11-15 23-1x", "11-15 24-19 8-11"):
+            self.write_openings("9-14 22-17\n" + line + "\n")
+            with self.assertRaises(ValueError):
+                read_openings(self.path)
+
+###########################################################
+class StatisticsTest(unittest.TestCase):
+    # draws only are evidence that A is not better: the test ends accepting H0 and the Elo interval is not empty
+    def test_draws_only(self):
+        lower_bound = math.log(SPRT_BETA / (1 - SPRT_ALPHA))
+        self.assertLess(sprt_log_likelihood_ratio(0, 500, 0, 0, 10), lower_bound)
+        self.assertLess(sprt_log_likelihood_ratio(0, 20, 0, 0, 10), sprt_log_likelihood_ratio(0, 10, 0, 0, 10))
+        elo, lower, upper = elo_estimate(0, 100, 0)
+        self.assertEqual(elo, 0)
+        self.assertLess(lower, 0)
+        self.assertGreater(upper, 0)
+
+    def test_wins_accept_h1(self):
+        upper_bound = math.log((1 - SPRT_BETA) / SPRT_ALPHA)
+        self.assertGreater(sprt_log_likelihood_ratio(300, 400, 200, 0, 10), upper_bound)
+
+########################################################################################################################
@@ -0,0 +1,97 @@
+########################################################################################################################
+# Tests of tablebase.py
+# Run with: python -m pytest (or python -m unittest)
+import io
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+
+from homework import BLACK_KING_ROW_MASK, BitBoard, WHITE_KING_ROW_MASK, enemys_color
+from tablebase import EndgameTablebase, generate_tablebase
+
+TEST_TABLEBASE_PIECES = 2
+
+###########################################################
+# Function to return every position with one to pieces pieces of each color and at most pieces pieces in total, as
+# (black, white, kings), leaving out men on the row where they would be kings
+def small_positions(pieces):
+    positions = []
+    for count in range(2, pieces + 1):
+        for squares in itertools.combinations(range(32), count):
+            for colors in itertools.product("bw", repeat=count):
+                for king_flags in itertools.product((False, True), repeat=count):
+                    black = white = kings = 0
+                    for square, color, is_king in zip(squares, colors, king_flags):
+                        bit = 1 << square
+                        if color == 'b':
+                            black |= bit
+                        else:
+                            white |= bit
+                        if is_king:
+                            kings |= bit
+                    if black and white and not (black & ~kings & BLACK_KING_ROW_MASK or
+                                                white & ~kings & WHITE_KING_ROW_MASK):
+                        positions.append((black, white, kings))
+    return positions
+
+###########################################################
+# Function to return the (outcome, plies) of every small position with each side to move, found by brute force:
+# plies after plies, a position is won if a move leads to a position lost one ply earlier, and lost once all its moves
+# lead to won positions, the longest of them one ply earlier. A position never decided is a draw.
+def brute_force_values(pieces):
+    children = {}
+    for black, white, kings in small_positions(pieces):
+        for color in "bw":
+            bitboard = BitBoard(black, white, kings)
+            children[(black, white, kings, color)] = []
+            for move in bitboard.moves(color):
+                undo = bitboard.make_move(move)
+                children[(black, white, kings, color)].append(
+                    (bitboard.black, bitboard.white, bitboard.kings, enemys_color(color)))
+                bitboard.unmake_move(undo)
+
+    values = {}
+    for position, position_children in children.items():
+        if len(position_children) == 0:
+            values[position] = (-1, 0)
+
+    plies = 0
+    while True:
+        plies += 1
+        decided = {}
+        for position, position_children in children.items():
+            if position in values:
+                continue
+            child_values = [(-1, 0) if not child[0] or not child[1] else values.get(child)
+                            for child in position_children]
+            if plies % 2 == 1 and (-1, plies - 1) in child_values:
+                decided[position] = (1, plies)
+            elif plies % 2 == 0 and all(value is not None and value[0] == 1 for value in child_values) and \
+                    max(value[1] for value in child_values) == plies - 1:
+                decided[position] = (-1, plies)
+        if len(decided) == 0 and plies > 2 + max(value[1] for value in values.values()):
+            break
+        values.update(decided)
+
+    for position in children:
+        values.setdefault(position, (0, 0))
+    return values
+
+###########################################################
+class TablebaseTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "test.tb")
+            generate_tablebase(TEST_TABLEBASE_PIECES, path, io.StringIO())
+            tablebase = EndgameTablebase(path)
+            for (black, white, kings, color), value in brute_force_values(TEST_TABLEBASE_PIECES).items():
+                self.assertEqual(tablebase.probe(BitBoard(black, white, kings), color), value,
+                                 (BitBoard(black, white, kings).to_grid(), color))
+            tablebase.close()
+        finally:
+            shutil.rmtree(directory)
+
+########################################################################################################################
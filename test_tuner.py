@@ -0,0 +1,85 @@
+########################################################################################################################
+# Tests of tuner.py
+# Run with: python -m pytest (or python -m unittest)
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import tuner
+from homework import DEFAULT_EVALUATION_WEIGHTS, enemys_color
+from opening_book import initial_position
+from tuner import batch_error_and_gradient, encode_position, make_batch, read_labelled_positions
+
+RANDOM_SEED = 561
+POSITIONS = 200
+SCALING_CONSTANT = 0.05
+FINITE_DIFFERENCE_STEP = 1e-4
+
+###########################################################
+# Function to return the positions of random games, labelled with random results
+def random_labelled_positions(rng, count):
+    positions = []
+    while len(positions) < count:
+        bitboard = initial_position()
+        color = 'b'
+        for ply in range(rng.randint(1, 80)):
+            moves = bitboard.moves(color)
+            if len(moves) == 0:
+                break
+            bitboard.make_move(rng.choice(moves))
+            color = enemys_color(color)
+        positions.append((encode_position(bitboard), rng.choice([0, 0.5, 1])))
+    return positions
+
+###########################################################
+# Function to return batch_error_and_gradient() of the positions computed without numpy
+def pure_python_error_and_gradient(positions, weights, scaling_constant):
+    saved_numpy = tuner.numpy
+    tuner.numpy = None
+    try:
+        return batch_error_and_gradient(make_batch(positions), weights, scaling_constant)
+    finally:
+        tuner.numpy = saved_numpy
+
+###########################################################
+class TunerTest(unittest.TestCase):
+    def setUp(self):
+        self.positions = random_labelled_positions(random.Random(RANDOM_SEED), POSITIONS)
+        self.weights = [float(weight) for kind in ("men", "kings") for weight in DEFAULT_EVALUATION_WEIGHTS[kind]]
+
+    # the gradient is the derivative of the mean squared error, checked weight by weight with finite differences
+    def test_gradient_matches_finite_differences(self):
+        error, gradient = pure_python_error_and_gradient(self.positions, self.weights, SCALING_CONSTANT)
+        for i in range(len(self.weights)):
+            higher = list(self.weights)
+            higher[i] += FINITE_DIFFERENCE_STEP
+            lower = list(self.weights)
+            lower[i] -= FINITE_DIFFERENCE_STEP
+            difference = (pure_python_error_and_gradient(self.positions, higher, SCALING_CONSTANT)[0] -
+                          pure_python_error_and_gradient(self.positions, lower, SCALING_CONSTANT)[0])
+            self.assertAlmostEqual(gradient[i], difference / (2 * FINITE_DIFFERENCE_STEP) / POSITIONS, places=6)
+
+    @unittest.skipIf(tuner.numpy is None, "numpy is not installed")
+    def test_numpy_matches_pure_python(self):
+        error, gradient = batch_error_and_gradient(make_batch(self.positions), self.weights, SCALING_CONSTANT)
+        expected_error, expected_gradient = pure_python_error_and_gradient(self.positions, self.weights,
+                                                                          SCALING_CONSTANT)
+        self.assertAlmostEqual(error, expected_error, places=9)
+        for value, expected in zip(gradient, expected_gradient):
+            self.assertAlmostEqual(value, expected, places=9)
+
+    # a text game with an illegal move gives no position, the games around it are read
+    def test_illegal_game_skipped(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "games.txt")
+            with open(path, "w") as games_file:
+                games_file.write("1-0 11-15 23-19\n0-1 11-15 23-19 15-11 22-17\n1/2-1/2 9-14\n")
+            labels = [label for codes, label in read_labelled_positions([path], skip_plies=0)]
+            self.assertEqual(labels, [1.0, 1.0, 0.5])
+        finally:
+            shutil.rmtree(directory)
+
+########################################################################################################################
@@ -0,0 +1,293 @@
+########################################################################################################################
+# Evaluation tuner
+# Fits the evaluation weights (the value of a man and of a king on every square, see homework.py) to the results of
+# played games, the Texel way: every quiet position of a game (the side to move has no capture) is labelled with the
+# result of the game for black (1 won, 0.5 drawn, 0 lost), and the weights are changed to make the mean squared error
+# between these labels and sigmoid(K * value of the position for black) as small as possible. K is fitted first, for
+# the starting weights, and kept as it is afterwards.
+# The games are streamed from their files in batches of positions, every pass over the data (epoch) reading them again,
+# so that the positions never have to fit in memory. Every batch makes one gradient step (Adam) computed over the whole
+# batch at once: with numpy, the positions of a batch are the rows of an N x 32 int8 array of square codes and their
+# values and the gradient come out of a few array operations with the weight vectors of the men and the kings; without
+# numpy, the same is computed from the list of pieces of every position.
+#
+# Usage: python tuner.py GAMES [GAMES ...] [--weights FILE] [--output FILE] [--epochs N] [--batch-size N]
+#                        [--learning-rate RATE] [--skip-plies N] [--scale S]
+# GAMES are files of games in the format written by selfplay.py --games-output, or game records files written by
+# selfplay.py --records, whose positions are read straight from the records without replaying the games. The weights
+# are written to --output after every epoch, as integers, and are used by homework.py --weights and selfplay.py
+# --weights-a/--weights-b. As the default weights are small integers, --scale 10 (multiplying the starting weights by
+# 10) lets a first run tune them at a finer resolution.
+import argparse
+import math
+import sys
+
+from game_records import GameRecords, WHITE_TO_MOVE_FLAG, is_game_records_file
+from homework import BitBoard, DEFAULT_EVALUATION_WEIGHTS, enemys_color, is_legal_move, load_evaluation_weights, \
+    save_evaluation_weights
+from opening_book import initial_position, read_games
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DEFAULT_EPOCHS = 10
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_LEARNING_RATE = 0.1
+DEFAULT_SKIP_PLIES = 8  # the first plies of a game are the opening it was played from, not the engine's choice
+DEFAULT_WEIGHTS_FILE = "weights.json"
+
+# candidates for K, from 0.0001 to about 1.2 with a ratio of 1.1 from one to the next
+SCALING_CONSTANTS = [0.0001 * 1.1 ** i for i in range(100)]
+
+ADAM_BETA1 = 0.9
+ADAM_BETA2 = 0.999
+ADAM_EPSILON = 1e-8
+
+# codes of the squares of an encoded position
+EMPTY_SQUARE = 0
+BLACK_MAN_SQUARE = 1
+BLACK_KING_SQUARE = 2
+WHITE_MAN_SQUARE = -1
+WHITE_KING_SQUARE = -2
+
+###########################################################
+# Function to return a position as the list of the codes of its 32 squares (index i for serial position i+1)
+def encode_position(bitboard):
+    codes = [EMPTY_SQUARE] * 32
+    for i in range(32):
+        bit = 1 << i
+        if bitboard.black & bit:
+            codes[i] = BLACK_KING_SQUARE if bitboard.kings & bit else BLACK_MAN_SQUARE
+        elif bitboard.white & bit:
+            codes[i] = WHITE_KING_SQUARE if bitboard.kings & bit else WHITE_MAN_SQUARE
+    return codes
+
+###########################################################
+# Function to return the labelled positions of the games of some files, as (square codes, result for black) pairs
+# read one game at a time
+def read_labelled_positions(paths, skip_plies=DEFAULT_SKIP_PLIES):
+    for path in paths:
+        if is_game_records_file(path):
+            records = GameRecords(path)
+            for ply, black, white, kings, packed, result, flags in records.records():
+                bitboard = BitBoard(black, white, kings)
+                if ply >= skip_plies and not bitboard.jumpers('w' if flags & WHITE_TO_MOVE_FLAG else 'b'):
+                    yield encode_position(bitboard), (result + 1) / 2
+            records.close()
+            continue
+
+        for moves, result in read_games(path):
+            if moves is None:  # a line which is not a game
+                continue
+            label = (result + 1) / 2
+            bitboard = initial_position()
+            color = 'b'
+
+            # the positions are only given once the whole game is known to be legal, a game with an illegal move is
+            # left out
+            positions = []
+            for ply, move in enumerate(moves):
+                if not is_legal_move(bitboard, color, move):
+                    positions = []
+                    break
+                if ply >= skip_plies and not bitboard.jumpers(color):
+                    positions.append((encode_position(bitboard), label))
+                bitboard.make_move(move)
+                color = enemys_color(color)
+            yield from positions
+
+###########################################################
+# Function to return the positions of a list of (square codes, result) pairs in the form the batch functions use
+# With numpy, a batch is (men features, kings features, results), the features being N x 32 int8 arrays with, for the
+# weight of square j, 1 for a black piece on j and -1 for a white piece on the square turned around (31 - j), so that
+# the values of the positions are features @ weights. Without numpy, a batch is (pieces, results), pieces holding for
+# every position the list of the (weight index, sign) pairs of its pieces, men weights coming first and kings weights
+# after them.
+def make_batch(positions):
+    if numpy is not None:
+        codes = numpy.array([codes for codes, result in positions], dtype=numpy.int8)
+        men = (codes == BLACK_MAN_SQUARE).astype(numpy.int8) - (codes == WHITE_MAN_SQUARE)[:, ::-1]
+        kings = (codes == BLACK_KING_SQUARE).astype(numpy.int8) - (codes == WHITE_KING_SQUARE)[:, ::-1]
+        return men, kings, numpy.array([result for codes, result in positions])
+
+    pieces = []
+    for codes, result in positions:
+        position_pieces = []
+        for i, code in enumerate(codes):
+            if code == BLACK_MAN_SQUARE:
+                position_pieces.append((i, 1))
+            elif code == BLACK_KING_SQUARE:
+                position_pieces.append((32 + i, 1))
+            elif code == WHITE_MAN_SQUARE:
+                position_pieces.append((31 - i, -1))
+            elif code == WHITE_KING_SQUARE:
+                position_pieces.append((63 - i, -1))
+        pieces.append(position_pieces)
+    return pieces, [result for codes, result in positions]
+
+###########################################################
+# Function to return the batches of the positions of the games of some files, batch_size positions each (the last one
+# can be smaller)
+def read_batches(paths, batch_size=DEFAULT_BATCH_SIZE, skip_plies=DEFAULT_SKIP_PLIES):
+    positions = []
+    for position in read_labelled_positions(paths, skip_plies):
+        positions.append(position)
+        if len(positions) == batch_size:
+            yield make_batch(positions)
+            positions = []
+
+    if len(positions) != 0:
+        yield make_batch(positions)
+
+###########################################################
+# Function to return the values for black of the positions of a batch, given the weights as a list of 64 numbers (the
+# men weights followed by the kings weights)
+def batch_values(batch, weights):
+    if numpy is not None:
+        men, kings, results = batch
+        weights = numpy.asarray(weights, dtype=float)
+        return men @ weights[:32] + kings @ weights[32:]
+
+    pieces, results = batch
+    return [sum(sign * weights[index] for index, sign in position_pieces) for position_pieces in pieces]
+
+###########################################################
+# Function to return the sum of the squared errors of every candidate scaling constant over a batch
+def batch_scaling_errors(batch, weights, scaling_constants):
+    values = batch_values(batch, weights)
+    if numpy is not None:
+        results = batch[2]
+        predictions = 1 / (1 + numpy.exp(-numpy.clip(numpy.outer(values, scaling_constants), -500, 500)))
+        return list(((results[:, None] - predictions) ** 2).sum(axis=0))
+
+    results = batch[1]
+    errors = [0.0] * len(scaling_constants)
+    for value, result in zip(values, results):
+        for i, scaling_constant in enumerate(scaling_constants):
+            errors[i] += (result - sigmoid(scaling_constant * value)) ** 2
+    return errors
+
+###########################################################
+# Function to return (sum of the squared errors, gradient of their mean) over a batch, the gradient being a list of 64
+# numbers in the order of the weights
+def batch_error_and_gradient(batch, weights, scaling_constant):
+    values = batch_values(batch, weights)
+    if numpy is not None:
+        men, kings, results = batch
+        predictions = 1 / (1 + numpy.exp(-numpy.clip(scaling_constant * values, -500, 500)))
+        errors = results - predictions
+        # derivative of the mean squared error with respect to the value of every position
+        slopes = -2 * scaling_constant * errors * predictions * (1 - predictions) / len(results)
+        return float((errors ** 2).sum()), list(slopes @ men) + list(slopes @ kings)
+
+    pieces, results = batch
+    error = 0.0
+    gradient = [0.0] * 64
+    for position_pieces, value, result in zip(pieces, values, results):
+        prediction = sigmoid(scaling_constant * value)
+        error += (result - prediction) ** 2
+        slope = -2 * scaling_constant * (result - prediction) * prediction * (1 - prediction) / len(results)
+        for index, sign in position_pieces:
+            gradient[index] += sign * slope
+    return error, gradient
+
+###########################################################
+# Function to return 1 / (1 + e^-x), without overflowing for very negative x
+def sigmoid(x):
+    if x < -500:
+        return 0.0
+    return 1 / (1 + math.exp(-x))
+
+###########################################################
+# Function to return the scaling constant K with the smallest error for the weights, out of SCALING_CONSTANTS, and the
+# number of positions of the games
+def fit_scaling_constant(paths, weights, batch_size=DEFAULT_BATCH_SIZE, skip_plies=DEFAULT_SKIP_PLIES):
+    errors = [0.0] * len(SCALING_CONSTANTS)
+    positions = 0
+    for batch in read_batches(paths, batch_size, skip_plies):
+        errors = [error + batch_error for error, batch_error in
+                  zip(errors, batch_scaling_errors(batch, weights, SCALING_CONSTANTS))]
+        positions += len(batch[-1])
+
+    if positions == 0:
+        raise ValueError("no position to tune on in %s" % ", ".join(paths))
+    return SCALING_CONSTANTS[errors.index(min(errors))], positions
+
+###########################################################
+# Class making Adam gradient steps on a list of weights: every weight moves by about learning_rate per step, in the
+# direction its gradient has been pointing to lately
+class AdamOptimizer:
+    def __init__(self, weights, learning_rate=DEFAULT_LEARNING_RATE):
+        self.weights = list(weights)
+        self.learning_rate = learning_rate
+        self.first_moments = [0.0] * len(weights)
+        self.second_moments = [0.0] * len(weights)
+        self.steps = 0
+
+    ###########################################################
+    # Function to move the weights one step against the gradient
+    def step(self, gradient):
+        self.steps += 1
+        first_correction = 1 - ADAM_BETA1 ** self.steps
+        second_correction = 1 - ADAM_BETA2 ** self.steps
+
+        for i, derivative in enumerate(gradient):
+            self.first_moments[i] = ADAM_BETA1 * self.first_moments[i] + (1 - ADAM_BETA1) * derivative
+            self.second_moments[i] = ADAM_BETA2 * self.second_moments[i] + (1 - ADAM_BETA2) * derivative ** 2
+            self.weights[i] -= self.learning_rate * (self.first_moments[i] / first_correction) / (
+                math.sqrt(self.second_moments[i] / second_correction) + ADAM_EPSILON)
+
+###########################################################
+# Function to tune the weights (a dict as returned by load_evaluation_weights) on the games of some files, writing
+# the rounded weights to output_path after every epoch and the progress to report_stream
+# Returns the tuned weights
+def tune(paths, weights, output_path, epochs=DEFAULT_EPOCHS, batch_size=DEFAULT_BATCH_SIZE,
+         learning_rate=DEFAULT_LEARNING_RATE, skip_plies=DEFAULT_SKIP_PLIES, report_stream=sys.stderr):
+    optimizer = AdamOptimizer(list(weights["men"]) + list(weights["kings"]), learning_rate)
+    scaling_constant, positions = fit_scaling_constant(paths, optimizer.weights, batch_size, skip_plies)
+    report_stream.write("%d positions, K = %.5f (%s)\n" % (positions, scaling_constant,
+                                                           "numpy" if numpy is not None else "no numpy"))
+
+    for epoch in range(epochs):
+        error = 0.0
+        for batch in read_batches(paths, batch_size, skip_plies):
+            batch_error, gradient = batch_error_and_gradient(batch, optimizer.weights, scaling_constant)
+            optimizer.step(gradient)
+            error += batch_error
+
+        # the error of an epoch is summed while the weights change, it is a little higher than that of the weights
+        # at the end of the epoch
+        weights = {"men": [int(round(weight)) for weight in optimizer.weights[:32]],
+                   "kings": [int(round(weight)) for weight in optimizer.weights[32:]]}
+        save_evaluation_weights(weights, output_path)
+        report_stream.write("epoch %d: mean squared error %.6f\n" % (epoch + 1, error / positions))
+        report_stream.flush()
+
+    return weights
+
+###########################################################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune the evaluation weights on the results of played games")
+    parser.add_argument("games", nargs="+", help="files of games written by selfplay.py --games-output")
+    parser.add_argument("--weights", metavar="FILE", help="weights to start from (default: the default weights)")
+    parser.add_argument("--output", default=DEFAULT_WEIGHTS_FILE,
+                        help="file to write the tuned weights to (default: %s)" % DEFAULT_WEIGHTS_FILE)
+    parser.add_argument("--epochs", type=int, default=DEFAULT_EPOCHS,
+                        help="number of passes over the games (default: %d)" % DEFAULT_EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="number of positions of every gradient step (default: %d)" % DEFAULT_BATCH_SIZE)
+    parser.add_argument("--learning-rate", type=float, default=DEFAULT_LEARNING_RATE,
+                        help="how much a weight moves at every step (default: %.1f)" % DEFAULT_LEARNING_RATE)
+    parser.add_argument("--skip-plies", type=int, default=DEFAULT_SKIP_PLIES,
+                        help="number of plies left out at the start of every game (default: %d)" % DEFAULT_SKIP_PLIES)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="factor to multiply the starting weights by (default: 1)")
+    arguments = parser.parse_args()
+
+    start_weights = load_evaluation_weights(arguments.weights) if arguments.weights else DEFAULT_EVALUATION_WEIGHTS
+    start_weights = {kind: [arguments.scale * weight for weight in start_weights[kind]] for kind in ("men", "kings")}
+    tune(arguments.games, start_weights, arguments.output, arguments.epochs, arguments.batch_size,
+         arguments.learning_rate, arguments.skip_plies)
+########################################################################################################################